@@ -1,16 +1,30 @@
-import os, time, hmac, hashlib, random, asyncio, re
-from typing import Dict, Any, Optional, List
+import os, time, hmac, hashlib, asyncio, re, json, base64
+from typing import Dict, Any, Optional, List, Callable, Awaitable, AsyncIterator, Tuple
 
-import requests
+import httpx
 from urllib.parse import quote
 
 from fastapi import FastAPI, Request, Form, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import (
-    HTMLResponse, RedirectResponse, StreamingResponse, FileResponse, JSONResponse
+    HTMLResponse, RedirectResponse, StreamingResponse, FileResponse, JSONResponse, Response
 )
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.base import BaseHTTPMiddleware
+
+import metrics, snapshot
+from auth import AuthMiddleware, VerifiedSessions
+from cache import LookupCache, RenderCache, Stale
+from compression import CompressionMiddleware
+from dispatch import FAILED, SEARCHING, SearchBatcher
+from imagecache import CachedImage, ImageCache
+from progress import FINAL_STATES, QueuePoller
+from resilience import Breakers, CircuitOpen, StaleStore, begin_request, is_degraded, mark_degraded
+from sessions import make_store
+from suggest import SuggestIndex
+from library import (
+    ALBUM_SORTS, ARTIST_SORTS, AlbumStatusCache, LibraryIndex, artist_name, is_sort_key, keyset_page,
+    sorted_view,
+)
 
 # =========================
 # CONFIG & ENV
@@ -23,9 +37,82 @@ LIDARR_ROOT_FOLDER = os.getenv("LIDARR_ROOT_FOLDER", "/music")
 LIDARR_QUALITY_PROFILE = os.getenv("LIDARR_QUALITY_PROFILE", "").strip()
 LIDARR_METADATA_PROFILE = os.getenv("LIDARR_METADATA_PROFILE", "").strip()
 
+# Seconds between background refreshes of the in-memory library index.
+LIBRARY_TTL = float(os.getenv("LIBRARY_TTL", "300"))
+# Seconds an artist's album list and download status are reused.
+ALBUM_STATUS_TTL = float(os.getenv("ALBUM_STATUS_TTL", "120"))
+ALBUM_STATUS_MAX_ENTRIES = int(os.getenv("ALBUM_STATUS_MAX_ENTRIES", "1024"))
+# Seconds /artist/lookup and /search results are reused (empty results: LOOKUP_NEGATIVE_TTL).
+LOOKUP_TTL = float(os.getenv("LOOKUP_TTL", "600"))
+LOOKUP_NEGATIVE_TTL = float(os.getenv("LOOKUP_NEGATIVE_TTL", "60"))
+# Typeahead: include album titles (fetched via GET /album every SUGGEST_ALBUM_TTL seconds).
+SUGGEST_ALBUMS = os.getenv("SUGGEST_ALBUMS", "true").lower() in ("1", "true", "yes")
+SUGGEST_ALBUM_TTL = float(os.getenv("SUGGEST_ALBUM_TTL", "3600"))
+# Seconds a search waits for its sources before returning what it has.
+SEARCH_DEADLINE = float(os.getenv("SEARCH_DEADLINE", "8"))
+
+# Persistent state (image cache, ...) lives here; mount it as a volume.
+CONFIG_DIR = os.getenv("CONFIG_DIR", "/config")
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "512"))
+IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", "320"))
+IMAGE_CACHE_CONTROL = f"public, max-age={int(os.getenv('IMAGE_MAX_AGE', '86400'))}"
+# For versioned (?v=) and signed image URLs, whose content never changes.
+IMAGE_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
 NAVIDROME_URL = os.getenv("NAVIDROME_URL", "http://192.168.5.47:4533").rstrip("/")
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me")
 
+# Session storage: sqlite (shared file, survives restarts), cookie (stateless) or memory.
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite")
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(30 * 24 * 3600)))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "3600"))
+# Seconds a verified session cookie is trusted without re-checking the store.
+SESSION_CACHE_TTL = float(os.getenv("SESSION_CACHE_TTL", "30"))
+
+# Download progress: one shared poll of Lidarr's /queue and /command every
+# QUEUE_POLL_INTERVAL seconds, only while someone is watching.
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "5"))
+QUEUE_PAGE_SIZE = int(os.getenv("QUEUE_PAGE_SIZE", "200"))
+# Album searches arriving within this many seconds go to Lidarr as one AlbumSearch.
+SEARCH_BATCH_WINDOW = float(os.getenv("SEARCH_BATCH_WINDOW", "1.5"))
+SEARCH_BATCH_MAX = int(os.getenv("SEARCH_BATCH_MAX", "100"))
+
+# Shared secret for /hooks/lidarr; Lidarr sends it as ?token= or the basic-auth password.
+WEBHOOK_TOKEN = os.getenv("WEBHOOK_TOKEN", "")
+
+# Optional bearer token for /metrics (which is otherwise open, like a scrape target).
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Rendered artist/album pages are reused for PAGE_CACHE_TTL seconds while
+# their upstream data is unchanged.
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "60"))
+PAGE_CACHE_ENTRIES = int(os.getenv("PAGE_CACHE_ENTRIES", "256"))
+# Album cards per flushed chunk when an artist page is streamed.
+ARTIST_PAGE_CHUNK = max(1, int(os.getenv("ARTIST_PAGE_CHUNK", "24")))
+
+# Warm-start snapshot of cached Lidarr state, rewritten every SNAPSHOT_INTERVAL
+# seconds (0 disables) and ignored at startup once older than SNAPSHOT_MAX_AGE.
+SNAPSHOT_INTERVAL = float(os.getenv("SNAPSHOT_INTERVAL", "300"))
+SNAPSHOT_MAX_AGE = float(os.getenv("SNAPSHOT_MAX_AGE", str(7 * 24 * 3600)))
+
+# Shared upstream connection pool. Every Lidarr/Navidrome call goes through one
+# keep-alive client so handshakes are paid once per connection, not per call.
+LIDARR_POOL_MAX_CONNECTIONS = int(os.getenv("LIDARR_POOL_MAX_CONNECTIONS", "100"))
+LIDARR_POOL_MAX_KEEPALIVE = int(os.getenv("LIDARR_POOL_MAX_KEEPALIVE", "20"))
+LIDARR_CONNECT_TIMEOUT = float(os.getenv("LIDARR_CONNECT_TIMEOUT", "5"))
+
+# Outage handling, per Lidarr endpoint class: the circuit opens after
+# LIDARR_BREAKER_FAILURES consecutive errors and retries after
+# LIDARR_BREAKER_RESET seconds; at most LIDARR_BULKHEAD calls per class run at
+# once (others wait up to LIDARR_BULKHEAD_WAIT seconds). Meanwhile GETs are
+# answered from the last good response, if there is one.
+LIDARR_BREAKER_FAILURES = int(os.getenv("LIDARR_BREAKER_FAILURES", "5"))
+LIDARR_BREAKER_RESET = float(os.getenv("LIDARR_BREAKER_RESET", "30"))
+LIDARR_BULKHEAD = int(os.getenv("LIDARR_BULKHEAD", "16"))
+LIDARR_BULKHEAD_WAIT = float(os.getenv("LIDARR_BULKHEAD_WAIT", "2"))
+LIDARR_STALE_ENTRIES = int(os.getenv("LIDARR_STALE_ENTRIES", "2048"))
+LIDARR_STALE_MAX_MB = int(os.getenv("LIDARR_STALE_MAX_MB", "64"))
+
 if LIDARR_URL_RAW.endswith("/api/v1"):
     LIDARR_API_BASE = LIDARR_URL_RAW
 else:
@@ -33,6 +120,90 @@ else:
 
 app = FastAPI(title="Museerr · Lidarr-only")
 
+# =========================
+# METRICS
+# =========================
+registry = metrics.Registry()
+http_requests = registry.counter(
+    "museerr_http_requests_total", "HTTP requests handled", ("route", "method", "status"))
+http_latency = registry.histogram(
+    "museerr_http_request_duration_seconds", "HTTP request latency including body streaming", ("route", "method"))
+http_in_flight = registry.gauge("museerr_http_requests_in_flight", "HTTP requests currently being served")
+upstream_requests = registry.counter(
+    "museerr_upstream_requests_total", "Upstream requests by endpoint and status", ("upstream", "endpoint", "method", "status"))
+upstream_errors = registry.counter(
+    "museerr_upstream_errors_total", "Upstream requests that raised (timeouts, connection errors)",
+    ("upstream", "endpoint", "method"))
+upstream_latency = registry.histogram(
+    "museerr_upstream_request_duration_seconds", "Upstream request latency", ("upstream", "endpoint", "method"))
+upstream_in_flight = registry.gauge("museerr_upstream_requests_in_flight", "Upstream requests in flight", ("upstream",))
+profile_cache_events = registry.counter(
+    "museerr_profile_cache_events_total", "Quality/metadata profile id cache lookups", ("result",))
+
+_ID_SEGMENT = re.compile(r"/(\d+|[0-9a-fA-F-]{36})(?=/|$)")
+
+def endpoint_label(path: str) -> str:
+    """Collapse ids out of an upstream path so label cardinality stays bounded."""
+    if path.startswith("/mediacover"):
+        return "/mediacover"
+    return _ID_SEGMENT.sub("/{id}", path)
+
+class track_upstream:
+    """Times one upstream call: ``with track_upstream("lidarr", "GET", path) as t: ...; t.status = ...``"""
+    def __init__(self, upstream: str, method: str, path: str):
+        self.labels = {"upstream": upstream, "endpoint": endpoint_label(path), "method": method}
+        self.status: Any = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        upstream_in_flight.inc(upstream=self.labels["upstream"])
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        upstream_in_flight.dec(upstream=self.labels["upstream"])
+        upstream_latency.observe(time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            upstream_errors.inc(**self.labels)
+            upstream_requests.inc(status="error", **self.labels)
+        else:
+            upstream_requests.inc(status=str(self.status), **self.labels)
+        return False
+
+def route_label(scope) -> str:
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    for prefix in ("/static", "/icons"):
+        if path.startswith(prefix + "/"):
+            return prefix
+    return "unmatched"
+
+class MetricsMiddleware:
+    """Pure ASGI so streamed responses are timed to their last byte unbuffered."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec()
+            route, method = route_label(scope), scope["method"]
+            http_latency.observe(time.perf_counter() - start, route=route, method=method)
+            http_requests.inc(route=route, method=method, status=str(status["code"]))
+
 # =========================
 # STATIC & TEMPLATE SETUP
 # =========================
@@ -41,41 +212,122 @@ app.mount("/icons", StaticFiles(directory=os.path.join("static", "icons")), name
 templates = Jinja2Templates(directory="templates")
 
 @app.get("/style.css")
-def style(): 
+async def style(): 
     return FileResponse(os.path.join("static", "style.css"))
 
 @app.get("/app.js")
-def js(): 
+async def js(): 
     return FileResponse(os.path.join("static", "app.js"))
 
 @app.get("/manifest.webmanifest")
-def manifest(): 
+async def manifest(): 
     return FileResponse(os.path.join("static", "manifest.webmanifest"))
 
+def dir_digest(directory: str) -> str:
+    """Short hash of every file under ``directory`` (names and contents)."""
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                h.update(os.path.relpath(path, directory).encode() + b"\0" + f.read())
+    return h.hexdigest()[:12]
+
+# The service worker's cache version: changes when any asset or template does,
+# and only then, so clients keep their caches across restarts.
+SW_CACHE_VERSION = dir_digest("static")[:6] + dir_digest("templates")[:6]
+
 @app.get("/service-worker.js")
-def sw(): 
-    return FileResponse(os.path.join("static", "service-worker.js"))
+async def sw():
+    with open(os.path.join("static", "service-worker.js"), encoding="utf-8") as f:
+        src = f.read().replace("__CACHE_VERSION__", SW_CACHE_VERSION)
+    return Response(src, media_type="application/javascript", headers={"Cache-Control": "no-cache"})
+
+# =========================
+# UPSTREAM RESILIENCE
+# =========================
+lidarr_breakers = Breakers(
+    failure_threshold=LIDARR_BREAKER_FAILURES, reset_after=LIDARR_BREAKER_RESET,
+    max_concurrent=LIDARR_BULKHEAD, queue_timeout=LIDARR_BULKHEAD_WAIT,
+)
+lidarr_stale = StaleStore(max_entries=LIDARR_STALE_ENTRIES, max_bytes=LIDARR_STALE_MAX_MB * 1024 * 1024)
+
+# Breaker per endpoint class, matched on the longest path prefix.
+LIDARR_ENDPOINT_CLASSES = {
+    "": "other",
+    "/artist": "artist",
+    "/artist/lookup": "lookup",
+    "/search": "lookup",
+    "/album": "album",
+    "/track": "track",
+    "/command": "command",
+    "/queue": "queue",
+    "/mediacover": "mediacover",
+    "/qualityprofile": "profile",
+    "/metadataprofile": "profile",
+}
+
+def lidarr_endpoint_class(path: str) -> str:
+    return LIDARR_ENDPOINT_CLASSES[max((k for k in LIDARR_ENDPOINT_CLASSES if path.startswith(k)), key=len)]
+
+def degraded() -> bool:
+    """True if this request was answered from stale data or hit an unreachable
+    Lidarr. Breakers this request didn't touch don't count: a failing /queue
+    must not flag every page."""
+    return is_degraded()
+
+templates.env.globals["degraded"] = degraded
+
+class DegradedMiddleware:
+    """Flags degraded responses with ``X-Museerr-Degraded: 1``."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        begin_request()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and degraded():
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-museerr-degraded", b"1")]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 # =========================
 # SIMPLE AUTH
 # =========================
-_sessions: Dict[str, Dict[str, Any]] = {}
+sessions = make_store(
+    SESSION_BACKEND, SECRET_KEY, SESSION_TTL, os.path.join(CONFIG_DIR, "sessions.db")
+)
 
-def _sign(v: str) -> str:
-    return hmac.new(SECRET_KEY.encode(), v.encode(), hashlib.sha256).hexdigest()
+def _mk_session(u: str) -> str:
+    return sessions.create({"u": u})
 
-def _mk_session(u: str, p: str) -> str:
-    sid = hashlib.sha1(f"{u}:{p}:{time.time()}".encode()).hexdigest()
-    _sessions[sid] = {"u": u, "p": p, "ts": time.time()}
-    return f"{sid}.{_sign(sid)}"
+# Cookies verified in the last SESSION_CACHE_TTL seconds skip the store lookup.
+verified_sessions = VerifiedSessions(sessions.get, ttl=SESSION_CACHE_TTL)
 
 def _get_session_cookie(v: Optional[str]):
-    if not v or "." not in v:
-        return None
-    sid, sig = v.split(".", 1)
-    if _sign(sid) == sig:
-        return _sessions.get(sid)
-    return None
+    return verified_sessions.get(v)
+
+# Long-running tasks started at startup; referenced here so they aren't
+# garbage-collected, and cancelled on shutdown.
+_background_tasks: List[asyncio.Task] = []
+
+async def _sweep_sessions():
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        try:
+            await asyncio.to_thread(sessions.sweep)
+        except Exception as e:
+            print("session sweep error:", e)
+
+@app.on_event("startup")
+async def _start_session_sweeper():
+    _background_tasks.append(asyncio.create_task(_sweep_sessions()))
 
 def require_auth(request: Request):
     s = request.cookies.get("session")
@@ -84,75 +336,455 @@ def require_auth(request: Request):
         raise HTTPException(status_code=302, detail="Login required")
     return d
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        path = request.url.path
-        if any(path.startswith(x) for x in [
-            "/login", "/token", "/static", "/icons",
-            "/manifest.webmanifest", "/style.css", "/app.js", "/service-worker.js"
-        ]):
-            return await call_next(request)
-        try:
-            require_auth(request)
-        except HTTPException:
-            return RedirectResponse("/login")
-        return await call_next(request)
+# Reachable without a session: exact paths, then path prefixes.
+AUTH_PUBLIC_PATHS = (
+    "/login", "/token", "/metrics",
+    "/manifest.webmanifest", "/style.css", "/app.js", "/service-worker.js",
+)
+AUTH_PUBLIC_PREFIXES = ("/static/", "/icons/", "/hooks/")
 
-app.add_middleware(AuthMiddleware)
+app.add_middleware(
+    AuthMiddleware, sessions=verified_sessions,
+    public_paths=AUTH_PUBLIC_PATHS, public_prefixes=AUTH_PUBLIC_PREFIXES,
+)
+app.add_middleware(DegradedMiddleware)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/login", response_class=HTMLResponse)
-def login_page(request: Request):
+async def login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/token")
-def do_login(username: str = Form(...), password: str = Form(...)):
+async def do_login(username: str = Form(...), password: str = Form(...)):
     # Best-effort ping to Navidrome
     try:
-        requests.get(
-            f"{NAVIDROME_URL}/rest/ping.view",
-            params={"u": username, "p": password, "v": "1.13.0", "c": "museerr", "f": "json"},
-            timeout=5
-        )
+        with track_upstream("navidrome", "GET", "/rest/ping.view") as t:
+            r = await http_client().get(
+                f"{NAVIDROME_URL}/rest/ping.view",
+                params={"u": username, "p": password, "v": "1.13.0", "c": "museerr", "f": "json"},
+                timeout=5
+            )
+            t.status = r.status_code
     except Exception:
         pass
-    cookie = _mk_session(username, password)
+    cookie = _mk_session(username)
     r = RedirectResponse("/", status_code=302)
-    r.set_cookie("session", cookie, httponly=True, samesite="lax")
+    r.set_cookie("session", cookie, httponly=True, samesite="lax", max_age=int(SESSION_TTL))
     return r
 
 @app.get("/logout")
-def logout(request: Request):
-    s = request.cookies.get("session")
-    if s and "." in s:
-        sid, _ = s.split(".", 1)
-        _sessions.pop(sid, None)
-    return RedirectResponse("/login", status_code=302)
+async def logout(request: Request):
+    verified_sessions.forget(request.cookies.get("session"))
+    sessions.delete(request.cookies.get("session"))
+    r = RedirectResponse("/login", status_code=302)
+    r.delete_cookie("session")
+    return r
 
 # =========================
 # LIDARR HELPERS
 # =========================
+_http: Optional[httpx.AsyncClient] = None
+
+# Read timeouts per Lidarr endpoint, matched on the longest path prefix.
+# MusicBrainz-backed lookups and commands are slow; covers should fail fast.
+LIDARR_TIMEOUTS = {
+    "": 20.0,
+    "/artist/lookup": 20.0,
+    "/search": 20.0,
+    "/command": 30.0,
+    "/queue": 10.0,
+    "/mediacover": 8.0,
+    "/qualityprofile": 10.0,
+    "/metadataprofile": 10.0,
+}
+
+def http_client() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LIDARR_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=LIDARR_POOL_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(20.0, connect=LIDARR_CONNECT_TIMEOUT),
+        )
+    return _http
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    global _http
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+def lidarr_timeout(path: str) -> httpx.Timeout:
+    key = max((k for k in LIDARR_TIMEOUTS if path.startswith(k)), key=len)
+    return httpx.Timeout(LIDARR_TIMEOUTS[key], connect=LIDARR_CONNECT_TIMEOUT)
+
 def lidarr_headers(): 
     return {"X-Api-Key": LIDARR_API_KEY} if LIDARR_API_KEY else {}
 
-def lidarr_get(path: str, params: Optional[dict] = None):
-    return requests.get(f"{LIDARR_API_BASE.rstrip('/')}{path}", headers=lidarr_headers(), params=params or {}, timeout=20)
+def _stale_response(key: Tuple, url: str) -> Optional[httpx.Response]:
+    hit = lidarr_stale.get(key)
+    if hit is None:
+        return None
+    mark_degraded()
+    content, media_type = hit
+    return httpx.Response(
+        200, content=content, headers={"content-type": media_type, "x-museerr-stale": "1"},
+        request=httpx.Request("GET", url),
+    )
+
+async def lidarr_get(path: str, params: Optional[dict] = None, stale: bool = True) -> httpx.Response:
+    """GET from Lidarr behind the endpoint class's breaker and bulkhead. On
+    errors, 5xx or an open circuit, the last good 200 for the same request is
+    returned instead (and the request marked degraded) when there is one;
+    pass ``stale=False`` for state that must not be served out of date."""
+    url = f"{LIDARR_API_BASE.rstrip('/')}{path}"
+    key = (path, tuple(sorted((params or {}).items())))
+    breaker = lidarr_breakers.get(lidarr_endpoint_class(path))
+    try:
+        async with breaker.call():
+            with track_upstream("lidarr", "GET", path) as t:
+                r = await http_client().get(
+                    url, headers=lidarr_headers(), params=params or {}, timeout=lidarr_timeout(path)
+                )
+                t.status = r.status_code
+    except (httpx.TransportError, CircuitOpen) as e:
+        if not isinstance(e, CircuitOpen):
+            breaker.failure()
+        old = _stale_response(key, url) if stale else None
+        if old is None:
+            mark_degraded()
+            raise
+        return old
+    if r.status_code >= 500:
+        breaker.failure()
+        return (_stale_response(key, url) if stale else None) or r
+    breaker.success()
+    if stale and r.status_code == 200:
+        lidarr_stale.put(key, (r.content, r.headers.get("content-type", "application/json")), len(r.content))
+    return r
 
-def lidarr_post(path: str, payload: dict):
-    return requests.post(f"{LIDARR_API_BASE.rstrip('/')}{path}", headers={**lidarr_headers(), "Content-Type": "application/json"}, json=payload, timeout=30)
+async def lidarr_post(path: str, payload: dict) -> httpx.Response:
+    breaker = lidarr_breakers.get(lidarr_endpoint_class(path))
+    try:
+        async with breaker.call():
+            with track_upstream("lidarr", "POST", path) as t:
+                r = await http_client().post(
+                    f"{LIDARR_API_BASE.rstrip('/')}{path}", headers={**lidarr_headers(), "Content-Type": "application/json"},
+                    json=payload, timeout=lidarr_timeout(path)
+                )
+                t.status = r.status_code
+    except httpx.TransportError:
+        breaker.failure()
+        mark_degraded()
+        raise
+    except CircuitOpen:
+        mark_degraded()
+        raise
+    if r.status_code >= 500:
+        breaker.failure()
+    else:
+        breaker.success()
+    return r
+
+async def open_image(
+    url: str, headers: Optional[dict] = None, timeout: Any = 8.0, upstream: str = "remote-cover"
+) -> Optional[httpx.Response]:
+    """Open a streamed response for an image URL, or None if it isn't an image."""
+    return (await _open_image(url, headers, timeout, upstream))[1]
+
+async def _open_image(
+    url: str, headers: Optional[dict], timeout: Any, upstream: str
+) -> Tuple[int, Optional[httpx.Response]]:
+    client = http_client()
+    req = client.build_request("GET", url, headers=headers or {}, timeout=timeout)
+    with track_upstream(upstream, "GET", "/mediacover" if upstream == "lidarr" else "/cover") as t:
+        r = await client.send(req, stream=True, follow_redirects=True)
+        t.status = r.status_code
+    if r.status_code == 200 and r.headers.get("content-type","").startswith("image/"):
+        return r.status_code, r
+    await r.aclose()
+    return r.status_code, None
+
+async def lidarr_media_cover(artist_id: str, filenames: List[str]) -> Optional[httpx.Response]:
+    """Open a streamed mediacover response for the first filename Lidarr has, or None."""
+    breaker = lidarr_breakers.get("mediacover")
+    for f in filenames:
+        path = f"/mediacover/artist/{artist_id}/{f}"
+        try:
+            # The bulkhead slot covers opening the response, not streaming its body.
+            async with breaker.call():
+                status, r = await _open_image(
+                    f"{LIDARR_API_BASE}{path}", lidarr_headers(), lidarr_timeout(path), upstream="lidarr"
+                )
+        except httpx.TransportError:
+            breaker.failure()
+            mark_degraded()
+            return None
+        except CircuitOpen:
+            mark_degraded()
+            return None
+        # As in lidarr_get: a 5xx counts against the circuit, a 404 (no such file) doesn't.
+        if status >= 500:
+            breaker.failure()
+            mark_degraded()
+            return None
+        breaker.success()
+        if r is not None:
+            return r
+    return None
+
+# =========================
+# IMAGE CACHE
+# =========================
+image_cache = ImageCache(os.path.join(CONFIG_DIR, "cache", "images"), IMAGE_CACHE_MAX_MB * 1024 * 1024)
+
+@app.on_event("startup")
+async def _load_image_cache():
+    await asyncio.to_thread(image_cache.load)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if not inm:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in inm.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+async def serve_image(
+    request: Request, img: CachedImage, size: Optional[str] = None, cache_control: str = IMAGE_CACHE_CONTROL
+) -> Response:
+    if size == "thumb":
+        img = await asyncio.to_thread(image_cache.thumbnail, img, IMAGE_THUMB_SIZE)
+    etag = f'"{img.digest}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(img.path, media_type=img.media_type, headers=headers)
+
+def stream_upstream(
+    r: httpx.Response, cache_key: Optional[str] = None, cache_control: str = IMAGE_CACHE_CONTROL
+) -> StreamingResponse:
+    """Stream an upstream image to the client, teeing it into the disk cache."""
+    media_type = r.headers["content-type"]
+    keep = cache_key is not None and image_cache.enabled
+
+    async def body():
+        buf, complete = bytearray(), False
+        try:
+            async for chunk in r.aiter_bytes():
+                if keep:
+                    buf.extend(chunk)
+                yield chunk
+            complete = True
+        finally:
+            await r.aclose()
+        if keep and complete:
+            await asyncio.to_thread(image_cache.put, cache_key, bytes(buf), media_type)
+
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": cache_control})
+
+async def cached_image(
+    request: Request, key: str, open_upstream: Callable[[], Awaitable[Optional[httpx.Response]]],
+    size: Optional[str] = None, cache_control: str = IMAGE_CACHE_CONTROL,
+) -> Optional[Response]:
+    """Serve ``key`` from the disk cache, filling it from ``open_upstream`` on a miss."""
+    img = await asyncio.to_thread(image_cache.get, key)
+    if img is not None:
+        return await serve_image(request, img, size, cache_control)
+    r = await open_upstream()
+    if r is None:
+        return None
+    if not size or not image_cache.enabled:
+        return stream_upstream(r, key, cache_control)
+    # Thumbnails need the whole original first.
+    try:
+        data = await r.aread()
+    finally:
+        await r.aclose()
+    media_type = r.headers["content-type"]
+    img = await asyncio.to_thread(image_cache.put, key, data, media_type)
+    if img is not None:
+        return await serve_image(request, img, size, cache_control)
+    return Response(data, media_type=media_type)
+
+async def _fetch_library() -> Optional[List[dict]]:
+    r = await lidarr_get("/artist")
+    if r.status_code != 200:
+        return None
+    # The full artist list can be several MB; parse it off the event loop.
+    return await asyncio.to_thread(json.loads, r.content) or []
+
+library = LibraryIndex(_fetch_library, ttl=LIBRARY_TTL)
+
+def _json_list(r: httpx.Response) -> Optional[List[dict]]:
+    """A 200's JSON list, wrapped in ``Stale`` if it is an outage fallback so
+    the caches fed from it don't keep it; None for any other status."""
+    if r.status_code != 200:
+        return None
+    data = r.json() or []
+    return Stale(data) if r.headers.get("x-museerr-stale") else data
+
+async def _fetch_artist_albums(artist_id: Any) -> Optional[List[dict]]:
+    return _json_list(await lidarr_get("/album", params={"artistId": artist_id}))
+
+async def _fetch_artist_tracks(artist_id: Any) -> Optional[List[dict]]:
+    return _json_list(await lidarr_get("/track", params={"artistId": artist_id}))
+
+album_status = AlbumStatusCache(
+    _fetch_artist_albums, _fetch_artist_tracks, ttl=ALBUM_STATUS_TTL,
+    max_entries=ALBUM_STATUS_MAX_ENTRIES, on_stale=mark_degraded,
+)
+
+async def _fetch_lookup(endpoint: str, term: str) -> Optional[List[dict]]:
+    params = {"term": term}
+    if endpoint == "/search":
+        params["type"] = "artist"
+    return _json_list(await lidarr_get(endpoint, params=params))
+
+lookups = LookupCache(
+    _fetch_lookup, ttl=LOOKUP_TTL, negative_ttl=LOOKUP_NEGATIVE_TTL, on_stale=mark_degraded
+)
+
+async def lidarr_lookup(term: str) -> List[dict]:
+    """Cached, coalesced GET /artist/lookup."""
+    return await lookups.get("/artist/lookup", term)
+
+async def lidarr_search(term: str) -> List[dict]:
+    """Cached, coalesced GET /search?type=artist."""
+    return await lookups.get("/search", term)
+
+async def library_changed():
+    """Drop cached state that depends on library membership after a write."""
+    lookups.invalidate()
+    await library.refresh()
+
+# =========================
+# TYPEAHEAD INDEX
+# =========================
+suggest_index = SuggestIndex()
+# (album id, title, artist id, artist name from the album payload, if any)
+_suggest_albums: List[Tuple[Any, str, Any, str]] = []
+_suggest_task: Optional[asyncio.Task] = None
+_suggest_dirty = False
+
+async def _rebuild_suggest():
+    global _suggest_dirty
+    while True:
+        _suggest_dirty = False
+        artists = [(a.get("id"), artist_name(a)) for a in library.artists]
+        # Resolve album artist names now, not at fetch time: the album list may
+        # have landed before the library index did.
+        albums = [
+            (id_, title, {"artist_id": artist_id, "artist": name or artist_name(library.get(artist_id) or {}) or None})
+            for id_, title, artist_id, name in _suggest_albums
+        ]
+        try:
+            await asyncio.to_thread(suggest_index.build, artists, albums)
+        except Exception as e:
+            print("suggest index build error:", e)
+        if not _suggest_dirty:
+            return
+
+def schedule_suggest_rebuild():
+    """Rebuild the typeahead index off the event loop, coalescing bursts."""
+    global _suggest_task, _suggest_dirty
+    if _suggest_task is None or _suggest_task.done():
+        _suggest_task = asyncio.create_task(_rebuild_suggest())
+    else:
+        _suggest_dirty = True
+
+library.listeners.append(schedule_suggest_rebuild)
+
+async def _refresh_suggest_albums():
+    while True:
+        try:
+            r = await lidarr_get("/album")
+            if r.status_code == 200:
+                raw = await asyncio.to_thread(json.loads, r.content) or []
+                _suggest_albums[:] = [
+                    (a.get("id"), a.get("title"), a.get("artistId"), artist_name(a.get("artist") or {}))
+                    for a in raw
+                ]
+                schedule_suggest_rebuild()
+        except Exception as e:
+            print("suggest album refresh error:", e)
+        await asyncio.sleep(SUGGEST_ALBUM_TTL)
+
+@app.on_event("startup")
+async def _start_library():
+    library.start()
+    if SUGGEST_ALBUMS:
+        _background_tasks.append(asyncio.create_task(_refresh_suggest_albums()))
+
+@app.on_event("shutdown")
+async def _stop_library():
+    await library.stop()
+    for t in _background_tasks:
+        t.cancel()
+
+def album_cover(alb: dict) -> Optional[str]:
+    for i in alb.get("images") or []:
+        if i.get("coverType") == "cover" and i.get("remoteUrl"):
+            return i["remoteUrl"]
+    return None
+
+# -------------------------
+# Image URLs for pages and JSON. Resolved from data Lidarr already returned,
+# so a grid of N cards costs no per-card lookups, and stable so browsers and
+# the service worker can cache them.
+# -------------------------
+def sign_image_url(url: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), url.encode(), hashlib.sha256).hexdigest()[:32]
+
+def remote_image_url(url: Optional[str], size: Optional[str] = "thumb") -> Optional[str]:
+    """Signed /image/remote URL that serves ``url`` through the image cache."""
+    if not url:
+        return None
+    out = f"/image/remote?url={quote(url, safe='')}&sig={sign_image_url(url)}"
+    return f"{out}&size={size}" if size else out
+
+def artist_image_version(a: Optional[dict]) -> Optional[str]:
+    """Changes whenever Lidarr rewrites the artist's poster."""
+    for i in (a or {}).get("images") or []:
+        if i.get("coverType") == "poster" and (i.get("url") or i.get("remoteUrl")):
+            url = i.get("url") or i["remoteUrl"]
+            m = re.search(r"[?&]lastWrite=([^&]+)", url)
+            return m.group(1) if m else hashlib.sha1(url.encode()).hexdigest()[:12]
+    return None
+
+def artist_image_url(a: dict, size: Optional[str] = "thumb") -> str:
+    local = library.get(a.get("id")) or library.get(a.get("foreignArtistId"))
+    if local is not None:
+        v = artist_image_version(local)
+        url = f"/artist/image?id={local['id']}" + (f"&v={quote(v)}" if v else "")
+        return f"{url}&size={size}" if size else url
+    # Not in Lidarr: use the poster the lookup already returned, if any.
+    for i in a.get("images") or []:
+        if i.get("coverType") == "poster" and i.get("remoteUrl"):
+            return remote_image_url(i["remoteUrl"], size)
+    key = a.get("foreignArtistId") or a.get("id")
+    if key:
+        return f"/artist/image?id={quote(str(key))}" + (f"&size={size}" if size else "")
+    return f"/artist/image?name={quote(artist_name(a))}" + (f"&size={size}" if size else "")
 
 # Cache for artist fallback images
 ARTIST_IMAGE_CACHE: Dict[str, str] = {}
 _profile_cache: Dict[str, int] = {}
 
-def _pick_profile_id(profile_type: str, preferred_name: str = "") -> Optional[int]:
+async def _pick_profile_id(profile_type: str, preferred_name: str = "") -> Optional[int]:
     key = f"{profile_type}:{preferred_name}"
     if key in _profile_cache:
+        profile_cache_events.inc(result="hit")
         return _profile_cache[key]
+    profile_cache_events.inc(result="miss")
     try:
         if profile_type == "quality":
-            r = lidarr_get("/qualityprofile")
+            r = await lidarr_get("/qualityprofile")
         else:
-            r = lidarr_get("/metadataprofile")
+            r = await lidarr_get("/metadataprofile")
         if r.status_code == 200:
             items = r.json() or []
             if preferred_name:
@@ -167,115 +799,375 @@ def _pick_profile_id(profile_type: str, preferred_name: str = "") -> Optional[in
         print("profile pick error:", e)
     return None
 
+# =========================
+# WARM-START SNAPSHOT
+# =========================
+SNAPSHOT_PATH = os.path.join(CONFIG_DIR, "cache", "snapshot.json.gz")
+
+def _snapshot_sections() -> Dict[str, Any]:
+    return {
+        "library": library.artists,
+        "profiles": dict(_profile_cache),
+        "lookups": lookups.dump(),
+        "artist_images": dict(ARTIST_IMAGE_CACHE),
+    }
+
+async def save_snapshot():
+    try:
+        await asyncio.to_thread(snapshot.save, SNAPSHOT_PATH, LIDARR_API_BASE, _snapshot_sections())
+    except Exception as e:
+        print("snapshot save error:", e)
+
+async def _revalidate_profiles(keys: List[str]):
+    for key in keys:
+        profile_type, _, name = key.partition(":")
+        _profile_cache.pop(key, None)
+        await _pick_profile_id(profile_type, name)
+
+async def _snapshot_loop():
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        await save_snapshot()
+
+@app.on_event("startup")
+async def _restore_snapshot():
+    if SNAPSHOT_INTERVAL <= 0:
+        return
+    doc = await asyncio.to_thread(snapshot.load, SNAPSHOT_PATH, LIDARR_API_BASE, SNAPSHOT_MAX_AGE)
+    if doc is not None:
+        # Restored state is only a head start: the library loop refetches it,
+        # lookups keep their original expiry and profile ids are re-resolved.
+        if doc.get("library"):
+            library.restore(doc["library"], doc["age"])
+        for key, pid in (doc.get("profiles") or {}).items():
+            _profile_cache.setdefault(key, pid)
+        lookups.restore(doc.get("lookups") or [])
+        for aid, cover in (doc.get("artist_images") or {}).items():
+            ARTIST_IMAGE_CACHE.setdefault(aid, cover)
+        print(f"snapshot: restored {len(library.artists)} artists, {len(doc.get('lookups') or [])} lookups "
+              f"({int(doc['age'])}s old)")
+        if _profile_cache:
+            _background_tasks.append(asyncio.create_task(_revalidate_profiles(list(_profile_cache))))
+    _background_tasks.append(asyncio.create_task(_snapshot_loop()))
+
+@app.on_event("shutdown")
+async def _save_snapshot_on_shutdown():
+    if SNAPSHOT_INTERVAL > 0:
+        await save_snapshot()
+
+# =========================
+# PAGE RENDERING
+# =========================
+rendered_pages = RenderCache(ttl=PAGE_CACHE_TTL, max_entries=PAGE_CACHE_ENTRIES)
+
+# Part of every page ETag, so a deploy with changed templates invalidates them.
+TEMPLATE_DIGEST = dir_digest("templates")
+
+def page_etag(request: Request, name: str, data: Any) -> str:
+    """Weak ETag over everything a page is rendered from."""
+    raw = json.dumps(
+        [name, TEMPLATE_DIGEST, str(request.base_url), degraded(), data],
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    return f'W/"{hashlib.sha256(raw.encode()).hexdigest()[:32]}"'
+
+def render_page(request: Request, name: str, data: Dict[str, Any]) -> Response:
+    """Render ``name`` with ``data``, answering If-None-Match with 304 and
+    reusing a recent rendering of the same inputs."""
+    etag = page_etag(request, name, data)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    html = rendered_pages.get(etag)
+    if html is None:
+        html = templates.get_template(name).render({"request": request, **data})
+        rendered_pages.put(etag, html)
+    return HTMLResponse(html, headers=headers)
+
 # =========================
 # ROUTES
 # =========================
 
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request):
+async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/discover/random")
-def discover_random():
+async def discover_random():
     try:
-        r = lidarr_get("/artist")
-        if r.status_code == 200:
-            data = r.json()
-            artists = []
-            for x in data:
-                name = x.get("artistName") or (x.get("artistMetadata") or {}).get("name")
-                if not name:
-                    continue
-                artists.append({
-                    "id": x.get("foreignArtistId") or x.get("id"),
-                    "name": name,
-                    "image_url": f"/artist/image?name={name.replace(' ', '+')}"
-                })
-            random.shuffle(artists)
-            return {"artists": artists[:18]}
+        await library.ensure_loaded()
+        artists = []
+        for x in library.sample(18):
+            name = artist_name(x)
+            artists.append({
+                "id": x.get("foreignArtistId") or x.get("id"),
+                "name": name,
+                "image_url": artist_image_url(x),
+            })
+        return {"artists": artists}
     except Exception as e:
         print("discover_random error:", e)
     return {"artists": []}
 
-@app.get("/search", response_class=HTMLResponse)
-def search_page(request: Request, q: Optional[str] = None):
-    results = []
-    if q:
-        seen = set()
-        lib_resp = lidarr_get("/artist")
-        library = lib_resp.json() if lib_resp.status_code == 200 else []
-        lib_names = {((a.get("artistName") or (a.get("artistMetadata") or {}).get("name") or "").lower()) for a in library}
-        lib_ids = {str(a.get("id")) for a in library}
-        lib_mbids = {str(a.get("foreignArtistId")) for a in library if a.get("foreignArtistId")}
-
-        local_resp = lidarr_get("/artist/lookup", params={"term": q})
-        remote_resp = lidarr_get("/search", params={"term": q, "type": "artist"})
-        local = local_resp.json() if local_resp.status_code == 200 else []
-        remote = remote_resp.json() if remote_resp.status_code == 200 else []
-
-        merged = (local or []) + (remote or [])
-        for a in merged:
-            name = (a.get("artistName") or (a.get("artistMetadata") or {}).get("name") or "").strip()
+# Search sources in display order: Lidarr's local lookup, then MusicBrainz search.
+SEARCH_SOURCES: Dict[str, Callable[[str], Awaitable[List[dict]]]] = {
+    "local": lidarr_lookup,
+    "remote": lidarr_search,
+}
+
+class SearchMerger:
+    """Dedupes artists across search sources and tags library membership,
+    one batch at a time so results can be emitted as each source lands."""
+    def __init__(self):
+        self.seen = set()
+        self.results: List[dict] = []
+
+    def add(self, items: Optional[List[dict]]) -> List[dict]:
+        new = []
+        for a in items or []:
+            name = artist_name(a)
             if not name:
                 continue
             id_ = a.get("id") or a.get("foreignArtistId") or name
-            if str(id_).lower() in seen:
+            if str(id_).lower() in self.seen:
                 continue
-            seen.add(str(id_).lower())
-            in_lib = str(id_) in lib_ids or str(id_) in lib_mbids or name.lower() in lib_names
-            results.append({
+            self.seen.add(str(id_).lower())
+            new.append({
                 "id": id_, "name": name,
-                "image_url": f"/artist/image?name={quote(name)}",
-                "in_library": in_lib
+                "image_url": artist_image_url(a),
+                "in_library": library.in_library(id_, name=name)
             })
-    return templates.TemplateResponse("search.html", {"request": request, "query": q or "", "results": results})
+        self.results.extend(new)
+        return new
+
+async def search_sources(q: str) -> AsyncIterator[Tuple[str, str, List[dict]]]:
+    """Query all sources concurrently, yielding (source, status, items) as each
+    finishes. Sources still running at SEARCH_DEADLINE are reported as
+    "timeout"; their upstream calls keep running and land in the lookup cache."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SEARCH_DEADLINE
+    tasks = {asyncio.create_task(fn(q)): name for name, fn in SEARCH_SOURCES.items()}
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for t in done:
+                if t.exception() is not None:
+                    print(f"search {tasks[t]} error:", t.exception())
+                    yield tasks[t], "error", []
+                else:
+                    yield tasks[t], "ok", t.result()
+        for t in pending:
+            yield tasks[t], "timeout", []
+    finally:
+        for t in pending:
+            t.cancel()
+
+@app.get("/search", response_class=HTMLResponse)
+async def search_page(request: Request, q: Optional[str] = None):
+    results = []
+    incomplete = False
+    if q:
+        await library.ensure_loaded()
+        batches = {}
+        async for source, status, items in search_sources(q):
+            batches[source] = items
+            incomplete = incomplete or status != "ok"
+        merger = SearchMerger()
+        for source in SEARCH_SOURCES:
+            merger.add(batches.get(source))
+        results = merger.results
+    return templates.TemplateResponse("search.html", {
+        "request": request, "query": q or "", "results": results, "incomplete": incomplete
+    })
+
+@app.get("/api/search")
+async def search_api(q: str, stream: bool = False):
+    """Artist search as JSON, or as NDJSON (``stream=1``) with one line per
+    source as soon as it answers, followed by a final ``done`` line."""
+    if not q.strip():
+        # Nothing to search for; don't send a blank query to every source.
+        if stream:
+            empty = json.dumps({"done": True, "count": 0}) + "\n"
+            return StreamingResponse(iter([empty]), media_type="application/x-ndjson")
+        return {"query": q, "sources": {}, "results": []}
+    await library.ensure_loaded()
+    merger = SearchMerger()
+    if not stream:
+        sources = {}
+        async for source, status, items in search_sources(q):
+            merger.add(items)
+            sources[source] = status
+        return {"query": q, "sources": sources, "results": merger.results}
+
+    async def lines():
+        async for source, status, items in search_sources(q):
+            yield json.dumps({"source": source, "status": status, "results": merger.add(items)}) + "\n"
+        yield json.dumps({"done": True, "count": len(merger.results)}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# =========================
+# LIBRARY API
+# =========================
+API_PAGE_MAX = 200
+
+def encode_cursor(sort: str, desc: bool, key: Tuple) -> str:
+    raw = json.dumps([sort, desc, list(key)], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, desc: bool) -> Tuple:
+    try:
+        c_sort, c_desc, key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if c_sort != sort or c_desc != desc:
+        raise HTTPException(status_code=400, detail="Cursor does not match sort order")
+    # Anything else would fail comparing against the view's keys in bisect.
+    if not is_sort_key(key):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return tuple(key)
+
+def select_fields(item: dict, fields: Optional[str]) -> dict:
+    if not fields:
+        return item
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    return {k: v for k, v in item.items() if k in wanted}
+
+def artist_summary(a: dict) -> dict:
+    st = a.get("statistics") or {}
+    return {
+        "id": a.get("id"),
+        "mbid": a.get("foreignArtistId"),
+        "name": artist_name(a),
+        "added": a.get("added"),
+        "monitored": a.get("monitored"),
+        "album_count": st.get("albumCount"),
+        "track_count": st.get("trackCount"),
+        "track_file_count": st.get("trackFileCount"),
+        "image_url": artist_image_url(a),
+    }
+
+def album_summary(alb: dict) -> dict:
+    return {
+        "id": alb.get("id"),
+        "title": alb.get("title"),
+        "type": alb.get("albumType"),
+        "released": alb.get("releaseDate"),
+        "year": (alb.get("releaseDate") or "")[:4],
+        "monitored": alb.get("monitored"),
+        "downloaded": alb.get("downloaded"),
+        "image_url": remote_image_url(album_cover(alb)),
+    }
+
+def _page_params(sort: str, order: str, limit: int, sorts: Dict[str, Any]) -> Tuple[bool, int]:
+    if sort not in sorts:
+        raise HTTPException(status_code=400, detail=f"sort must be one of: {', '.join(sorts)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be asc or desc")
+    return order == "desc", max(1, min(limit, API_PAGE_MAX))
+
+@app.get("/api/artists")
+async def api_artists(
+    sort: str = "name", order: str = "asc", limit: int = 50,
+    cursor: Optional[str] = None, fields: Optional[str] = None,
+):
+    desc, limit = _page_params(sort, order, limit, ARTIST_SORTS)
+    after = decode_cursor(cursor, sort, desc) if cursor else None
+    await library.ensure_loaded()
+    page, nxt = library.page(sort, after, limit, desc)
+    return {
+        "total": len(library.artists),
+        "items": [select_fields(artist_summary(a), fields) for a in page],
+        "next_cursor": encode_cursor(sort, desc, nxt) if nxt else None,
+    }
+
+@app.get("/api/artists/{artist_id}/albums")
+async def api_artist_albums(
+    artist_id: str, sort: str = "released", order: str = "desc", limit: int = 50,
+    cursor: Optional[str] = None, fields: Optional[str] = None,
+):
+    desc, limit = _page_params(sort, order, limit, ALBUM_SORTS)
+    after = decode_cursor(cursor, sort, desc) if cursor else None
+    await library.ensure_loaded()
+    artist = library.get(artist_id)
+    if artist is None:
+        raise HTTPException(status_code=404, detail="Artist not in library")
+    albums = await album_status.get(artist["id"])
+    page, nxt = keyset_page(sorted_view(albums, ALBUM_SORTS[sort]), after, limit, desc)
+    return {
+        "total": len(albums),
+        "items": [select_fields(album_summary(a), fields) for a in page],
+        "next_cursor": encode_cursor(sort, desc, nxt) if nxt else None,
+    }
+
+@app.get("/api/suggest")
+async def api_suggest(q: str = "", limit: int = 8):
+    """Typeahead over library artists and albums, answered from memory."""
+    items = suggest_index.query(q, max(1, min(limit, 20)))
+    for it in items:
+        it["url"] = f"/{it['type']}/{it['id']}"
+    return {"query": q, "suggestions": items}
 
 # =========================
 # IMAGE HANDLERS
 # =========================
 @app.get("/config/MediaCover/{artist_id}/{filename}")
-def legacy_media_cover_proxy(artist_id: str, filename: str):
+async def legacy_media_cover_proxy(request: Request, artist_id: str, filename: str):
     try:
-        for f in [filename, "poster-500.jpg", "poster.jpg"]:
-            url = f"{LIDARR_API_BASE}/mediacover/artist/{artist_id}/{f}"
-            r = requests.get(url, headers=lidarr_headers(), stream=True, timeout=8)
-            if r.status_code == 200 and r.headers.get("content-type","").startswith("image/"):
-                return StreamingResponse(r.raw, media_type=r.headers["content-type"])
+        resp = await cached_image(
+            request, f"mediacover:{artist_id}:{filename}",
+            lambda: lidarr_media_cover(artist_id, [filename, "poster-500.jpg", "poster.jpg"]),
+            request.query_params.get("size"),
+        )
+        if resp is not None:
+            return resp
     except Exception as e:
         print("legacy_media_cover_proxy error:", e)
     return FileResponse(os.path.join("static/icons", "icon-192.png"))
 
 @app.get("/artist/image")
-def artist_image(request: Request):
+async def artist_image(request: Request):
     name = request.query_params.get("name")
     artist_id = request.query_params.get("id")
+    size = request.query_params.get("size")
+    # Versioned URLs (see artist_image_url) never change content: cache them
+    # per version, and let browsers keep them for good.
+    version = request.query_params.get("v")
+    cache_control = IMAGE_IMMUTABLE_CACHE_CONTROL if version else IMAGE_CACHE_CONTROL
     try:
         if not artist_id and name:
-            look = lidarr_get("/artist/lookup", params={"term": name}).json()
+            look = await lidarr_lookup(name)
             if look:
                 artist_id = look[0].get("id") or look[0].get("foreignArtistId")
 
         if artist_id:
             aid = str(artist_id)
+            key = f"artist:{aid}@{version}" if version else f"artist:{aid}"
             if aid in ARTIST_IMAGE_CACHE:
-                from fastapi.responses import RedirectResponse
-                return RedirectResponse(ARTIST_IMAGE_CACHE[aid])
+                cover = ARTIST_IMAGE_CACHE[aid]
+                resp = await cached_image(request, key, lambda: open_image(cover), size, cache_control)
+                return resp or RedirectResponse(cover)
 
-            for f in ["poster-500.jpg", "poster.jpg"]:
-                url = f"{LIDARR_API_BASE}/mediacover/artist/{aid}/{f}"
-                r = requests.get(url, headers=lidarr_headers(), stream=True, timeout=8)
-                if r.status_code == 200 and r.headers.get("content-type","").startswith("image/"):
-                    return StreamingResponse(r.raw, media_type=r.headers["content-type"])
+            resp = await cached_image(
+                request, key, lambda: lidarr_media_cover(aid, ["poster-500.jpg", "poster.jpg"]), size, cache_control
+            )
+            if resp is not None:
+                return resp
 
             local_id = aid
             if not str(aid).isdigit():
-                lr = lidarr_get("/artist/lookup", params={"term": f"mbid:{aid}"})
-                if lr.status_code == 200 and lr.json():
-                    cand = lr.json()[0]
+                lr = await lidarr_lookup(f"mbid:{aid}")
+                if lr:
+                    cand = lr[0]
                     if cand.get("id"):
                         local_id = str(cand.get("id"))
 
-            ar = lidarr_get("/album", params={"artistId": local_id})
+            ar = await lidarr_get("/album", params={"artistId": local_id})
             if ar.status_code == 200:
                 albums = ar.json() or []
                 for alb in albums:
@@ -286,111 +1178,132 @@ def artist_image(request: Request):
                                 cover = i["remoteUrl"]
                                 break
                     if cover:
-                        from fastapi.responses import RedirectResponse
                         ARTIST_IMAGE_CACHE[aid] = cover
-                        return RedirectResponse(cover)
+                        resp = await cached_image(request, key, lambda: open_image(cover), size, cache_control)
+                        return resp or RedirectResponse(cover)
     except Exception as e:
         print("artist_image error:", e)
     return FileResponse(os.path.join("static/icons", "icon-192.png"))
 
+@app.get("/image/remote")
+async def remote_image(request: Request, url: str, sig: str, size: Optional[str] = None):
+    """Serve an external cover the server handed out (see remote_image_url)
+    through the disk cache. The signature keeps this from being an open proxy."""
+    if not hmac.compare_digest(sign_image_url(url), sig) or not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=403, detail="Invalid image signature")
+    key = "remote:" + hashlib.sha256(url.encode()).hexdigest()
+    try:
+        resp = await cached_image(request, key, lambda: open_image(url), size, IMAGE_IMMUTABLE_CACHE_CONTROL)
+        if resp is not None:
+            return resp
+    except Exception as e:
+        print("remote_image error:", e)
+    return FileResponse(os.path.join("static/icons", "icon-192.png"))
+
 # =========================
 # ARTIST DETAIL
 # =========================
 @app.get("/artist/{artist_id}", response_class=HTMLResponse)
-def artist_detail(request: Request, artist_id: str):
+async def artist_detail(request: Request, artist_id: str):
     in_library = False
     artist = None
-    albums = []
 
     def is_uuid(v: str): return re.match(r"^[0-9a-fA-F-]{36}$", v or "")
 
     try:
-        r = lidarr_get(f"/artist/{artist_id}")
-        if r.status_code == 200:
-            artist = r.json()
+        await library.ensure_loaded()
+        artist = library.get(artist_id)
+        if artist is not None:
             in_library = True
-        elif is_uuid(artist_id):
-            lr = lidarr_get("/artist/lookup", params={"term": f"mbid:{artist_id}"})
-            if lr.status_code == 200 and lr.json():
-                artist = lr.json()[0]
+        else:
+            r = await lidarr_get(f"/artist/{artist_id}")
+            if r.status_code == 200:
+                artist = r.json()
+                in_library = True
+        if artist is None and is_uuid(artist_id):
+            lr = await lidarr_lookup(f"mbid:{artist_id}")
+            if lr:
+                artist = lr[0]
             else:
-                sr = lidarr_get("/search", params={"term": artist_id, "type": "artist"})
-                if sr.status_code == 200 and sr.json():
-                    artist = sr.json()[0]
+                sr = await lidarr_search(artist_id)
+                if sr:
+                    artist = sr[0]
 
         if not artist:
             raise HTTPException(status_code=404, detail="Artist not found")
 
         # Double-check library membership
-        try:
-            all_artists = lidarr_get("/artist")
-            if all_artists.status_code == 200:
-                for a in all_artists.json():
-                    if (
-                        str(a.get("id")) == str(artist_id)
-                        or str(a.get("foreignArtistId")) == str(artist.get("foreignArtistId"))
-                    ):
-                        in_library = True
-                        break
-        except Exception as e:
-            print("library check error:", e)
+        if not in_library:
+            in_library = library.in_library(artist_id, artist.get("foreignArtistId"))
 
         resolved_id = artist.get("id") or artist_id
         name = artist.get("artistName") or (artist.get("artistMetadata") or {}).get("name") or "Unknown Artist"
-
-        # Build album list
-        ar = lidarr_get("/album", params={"artistId": resolved_id})
-        if ar.status_code == 200:
-            for alb in ar.json() or []:
-                img = None
-                if alb.get("images"):
-                    for i in alb["images"]:
-                        if i.get("coverType") == "cover" and i.get("remoteUrl"):
-                            img = i["remoteUrl"]
-                            break
-
-                tracks = lidarr_get("/track", params={"albumId": alb.get("id")}).json() or []
-                downloaded = all(t.get("hasFile") for t in tracks) if tracks else False
-
-                albums.append({
-                    "id": alb.get("id"),
-                    "title": alb.get("title"),
-                    "year": (alb.get("releaseDate") or "")[:4],
-                    "image_url": img,
-                    "downloaded": downloaded
-                })
-
-        ctx = {
-            "request": request,
-            "artist": {
-                "id": resolved_id,
-                "name": name,
-                "image_url": f"/artist/image?id={resolved_id}",
-                "in_library": in_library
-            },
-            "albums": albums
+        artist_ctx = {
+            "id": resolved_id,
+            "name": name,
+            "image_url": artist_image_url(artist),
+            "in_library": in_library
         }
 
-        return templates.TemplateResponse("artist.html", ctx)
+        # Album status already cached: render whole, with an ETag.
+        cached = album_status.peek(resolved_id)
+        if cached is not None:
+            ctx = {"artist": artist_ctx, "albums": [_album_card(alb) for alb in cached]}
+            return render_page(request, "artist.html", ctx)
+
+        return StreamingResponse(
+            _stream_artist_page(request, artist_ctx),
+            media_type="text/html",
+            headers={"Cache-Control": "private, no-cache"},
+        )
 
     except Exception as e:
         print("artist_detail error:", e)
         raise HTTPException(status_code=404, detail="Artist not found")
 
+def _album_card(alb: dict) -> dict:
+    return {
+        "id": alb.get("id"),
+        "title": alb.get("title"),
+        "year": (alb.get("releaseDate") or "")[:4],
+        "image_url": remote_image_url(album_cover(alb)),
+        "downloaded": alb["downloaded"]
+    }
+
+async def _stream_artist_page(request: Request, artist: dict):
+    """artist.html in parts: the header goes out before album status is
+    fetched, then the album cards follow in chunks of ARTIST_PAGE_CHUNK."""
+    ctx = {"request": request, "artist": artist, "albums": []}
+    banner_shown = degraded()
+    yield templates.get_template("artist/head.html").render(ctx)
+
+    try:
+        albums = [_album_card(alb) for alb in await album_status.get(artist["id"])]
+    except Exception as e:
+        print("artist_detail albums error:", e)
+        albums = []
+    # The header (and X-Museerr-Degraded) went out before Lidarr was asked.
+    ctx.update(albums=albums, show_banner=degraded() and not banner_shown)
+    yield templates.get_template("artist/albums_start.html").render(ctx)
+    cards = templates.get_template("artist/cards.html")
+    for i in range(0, len(albums), ARTIST_PAGE_CHUNK):
+        yield cards.render({**ctx, "albums": albums[i:i + ARTIST_PAGE_CHUNK]})
+    yield templates.get_template("artist/foot.html").render(ctx)
+
 # =========================
 # ALBUM DETAIL
 # =========================
 @app.get("/album/{album_id}", response_class=HTMLResponse)
-def album_detail(request: Request, album_id: str):
+async def album_detail(request: Request, album_id: str):
     try:
-        a = lidarr_get(f"/album/{album_id}")
+        a = await lidarr_get(f"/album/{album_id}")
         if a.status_code != 200:
             raise HTTPException(status_code=404, detail="Album not found")
         album = a.json()
 
         # Fetch tracks
         tracks = []
-        t = lidarr_get("/track", params={"albumId": album_id})
+        t = await lidarr_get("/track", params={"albumId": album_id})
         if t.status_code == 200:
             seen = set()
             for tr in t.json() or []:
@@ -419,57 +1332,158 @@ def album_detail(request: Request, album_id: str):
                     break
 
         ctx = {
-            "request": request,
             "album": {
                 "id": album.get("id"),
                 "title": album.get("title"),
                 "year": (album.get("releaseDate") or "")[:4],
-                "image_url": img
+                "image_url": remote_image_url(img, size=None)
             },
             "tracks": tracks_sorted
         }
-        return templates.TemplateResponse("album.html", ctx)
+        return render_page(request, "album.html", ctx)
     except Exception as e:
         print("album_detail error:", e)
         raise HTTPException(status_code=404, detail="Album not found")
 
 # =========================
-# NEW: ALBUM SEARCH COMMAND
+# DOWNLOAD PROGRESS
 # =========================
-@app.post("/album/search/{album_id}")
-def search_album(album_id: str):
+async def _fetch_queue() -> Optional[List[dict]]:
+    r = await lidarr_get(
+        "/queue", params={"page": 1, "pageSize": QUEUE_PAGE_SIZE, "includeAlbum": "true"}, stale=False
+    )
+    if r.status_code != 200:
+        return None
+    data = r.json() or {}
+    return (data.get("records") or []) if isinstance(data, dict) else data
+
+async def _fetch_commands() -> Optional[List[dict]]:
+    r = await lidarr_get("/command", stale=False)
+    return (r.json() or []) if r.status_code == 200 else None
+
+# Task ids handed to the frontend are Lidarr album ids.
+progress = QueuePoller(_fetch_queue, _fetch_commands, interval=QUEUE_POLL_INTERVAL)
+
+@app.on_event("startup")
+async def _start_progress():
+    progress.start()
+
+@app.on_event("shutdown")
+async def _stop_progress():
+    await progress.stop()
+
+@app.get("/status")
+async def download_status(ids: Optional[str] = None):
+    """Active album ids, limited to the comma-separated ``ids`` if given."""
+    progress.touch()
+    active = progress.active()
+    if ids is not None:
+        wanted = {i.strip() for i in ids.split(",")}
+        active = [a for a in active if a in wanted]
+    return {"active": active}
+
+@app.websocket("/ws/{task_id}")
+async def progress_ws(websocket: WebSocket, task_id: str):
+    # AuthMiddleware only sees HTTP requests, so check the session here.
+    if not _get_session_cookie(websocket.cookies.get("session")):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    updates = progress.subscribe(task_id)
+    closed = asyncio.create_task(websocket.receive())
     try:
-        payload = {"name": "AlbumSearch", "albumIds": [int(album_id)]}
-        r = lidarr_post("/command", payload)
-        print("Search album response:", r.status_code, r.text)
-        if r.status_code in (200, 201):
-            return JSONResponse({"status": "ok", "message": "Album search triggered"})
-        return JSONResponse({"status": "error", "message": "Failed to trigger search"}, status_code=500)
-    except Exception as e:
-        print("album_search error:", e)
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+        while True:
+            nxt = asyncio.create_task(updates.get())
+            done, _ = await asyncio.wait({nxt, closed}, return_when=asyncio.FIRST_COMPLETED)
+            if closed in done:
+                nxt.cancel()
+                break
+            msg = nxt.result()
+            await websocket.send_json({**msg, "task_id": task_id})
+            if msg["status"] in FINAL_STATES:
+                await websocket.close()
+                break
+    except WebSocketDisconnect:
+        pass
+    finally:
+        closed.cancel()
+        progress.unsubscribe(task_id, updates)
+
+# =========================
+# ALBUM SEARCH COMMANDS
+# =========================
+async def _send_album_search(album_ids: List[int]) -> bool:
+    r = await lidarr_post("/command", {"name": "AlbumSearch", "albumIds": album_ids})
+    print("Search album response:", r.status_code, album_ids)
+    if r.status_code not in (200, 201):
+        return False
+    progress.watch(album_ids)
+    return True
+
+album_searches = SearchBatcher(
+    _send_album_search, progress.is_active, progress.refresh,
+    window=SEARCH_BATCH_WINDOW, max_batch=SEARCH_BATCH_MAX,
+)
+
+def _search_response(statuses: Dict[str, str], **extra: Any) -> JSONResponse:
+    started = sum(1 for v in statuses.values() if v == SEARCHING)
+    failed = [k for k, v in statuses.items() if v == FAILED]
+    body = {
+        "status": "error" if failed and len(failed) == len(statuses) else "ok",
+        "albums": statuses,
+        "tasks": [k for k in statuses if k not in failed],
+        **extra,
+    }
+    if not statuses:
+        body["message"] = "Nothing to search for"
+    elif body["status"] == "error":
+        body["message"] = "Failed to trigger search"
+    elif started:
+        body["message"] = f"Search triggered for {started} album{'s' if started != 1 else ''}"
+    else:
+        body["message"] = "Already queued in Lidarr"
+    return JSONResponse(body, status_code=500 if body["status"] == "error" else 200)
+
+@app.post("/album/search/{album_id}")
+async def search_album(album_id: str):
+    if not album_id.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid album id")
+    return _search_response(await album_searches.request([album_id]), task_id=album_id)
+
+@app.post("/artist/{artist_id}/search_missing")
+async def search_missing_albums(artist_id: str):
+    """Search for every monitored album of an artist that isn't fully downloaded."""
+    await library.ensure_loaded()
+    artist = library.get(artist_id)
+    if artist is None:
+        raise HTTPException(status_code=404, detail="Artist not in library")
+    missing = [
+        a["id"] for a in await album_status.get(artist["id"])
+        if a.get("id") is not None and not a["downloaded"] and a.get("monitored", True)
+    ]
+    return _search_response(await album_searches.request(missing))
 
 # =========================
 # ADD ARTIST
 # =========================
 @app.post("/add_artist")
-def add_artist(artist_id: str = Form(...), artist_name: str = Form(...)):
+async def add_artist(artist_id: str = Form(...), artist_name: str = Form(...)):
     try:
         artist = None
-        lr = lidarr_get("/artist/lookup", params={"term": artist_id})
-        if lr.status_code == 200 and lr.json():
-            artist = lr.json()[0]
+        lr = await lidarr_lookup(artist_id)
+        if lr:
+            artist = lr[0]
         else:
-            lr2 = lidarr_get("/artist/lookup", params={"term": artist_name})
-            if lr2.status_code == 200 and lr2.json():
-                artist = lr2.json()[0]
+            lr2 = await lidarr_lookup(artist_name)
+            if lr2:
+                artist = lr2[0]
         if not artist:
             raise HTTPException(status_code=404, detail="Artist not found")
 
         mbid = artist.get("foreignArtistId") or artist.get("id")
         name = artist.get("artistName") or (artist.get("artistMetadata") or {}).get("name") or artist_name
-        qid = _pick_profile_id("quality", LIDARR_QUALITY_PROFILE) or 1
-        mid = _pick_profile_id("metadata", LIDARR_METADATA_PROFILE) or 1
+        qid = await _pick_profile_id("quality", LIDARR_QUALITY_PROFILE) or 1
+        mid = await _pick_profile_id("metadata", LIDARR_METADATA_PROFILE) or 1
 
         payload = {
             "foreignArtistId": mbid,
@@ -482,33 +1496,34 @@ def add_artist(artist_id: str = Form(...), artist_name: str = Form(...)):
             "addOptions": {"searchForMissingAlbums": True},
         }
 
-        pr = lidarr_post("/artist", payload)
+        pr = await lidarr_post("/artist", payload)
         print("Add artist response:", pr.status_code, pr.text)
         if pr.status_code not in (200, 201):
             raise HTTPException(status_code=500, detail="Failed to add artist")
 
+        await library_changed()
         return RedirectResponse(f"/artist/{artist_id}", status_code=302)
     except Exception as e:
         print("add_artist error:", e)
         raise HTTPException(status_code=500, detail="Error adding artist")
 
 @app.post("/download_artist")
-def download_artist(artist_id: str = Form(...)):
+async def download_artist(artist_id: str = Form(...)):
     try:
         artist = None
-        r = lidarr_get(f"/artist/{artist_id}")
+        r = await lidarr_get(f"/artist/{artist_id}")
         if r.status_code == 200:
             artist = r.json()
         else:
-            lr = lidarr_get("/artist/lookup", params={"term": artist_id})
-            if lr.status_code == 200 and lr.json():
-                artist = lr.json()[0]
+            lr = await lidarr_lookup(artist_id)
+            if lr:
+                artist = lr[0]
         if not artist:
             raise HTTPException(status_code=404, detail="Artist not found")
 
         mbid = artist.get("foreignArtistId") or artist.get("id")
-        qid = _pick_profile_id("quality", LIDARR_QUALITY_PROFILE) or 1
-        mid = _pick_profile_id("metadata", LIDARR_METADATA_PROFILE) or 1
+        qid = await _pick_profile_id("quality", LIDARR_QUALITY_PROFILE) or 1
+        mid = await _pick_profile_id("metadata", LIDARR_METADATA_PROFILE) or 1
         payload = {
             "foreignArtistId": mbid,
             "rootFolderPath": LIDARR_ROOT_FOLDER,
@@ -517,13 +1532,135 @@ def download_artist(artist_id: str = Form(...)):
             "monitored": True, "monitorNewItems": "all",
             "addOptions": {"searchForMissingAlbums": True}
         }
-        pr = lidarr_post("/artist", payload)
+        pr = await lidarr_post("/artist", payload)
         print("Add artist response:", pr.status_code, pr.text)
+        if pr.status_code in (200, 201):
+            await library_changed()
         return RedirectResponse(f"/artist/{artist_id}", status_code=302)
     except Exception as e:
         print("download_artist error:", e)
         raise HTTPException(status_code=500, detail="Failed to add artist")
 
+# =========================
+# LIDARR WEBHOOKS
+# =========================
+webhook_events = registry.counter("museerr_webhook_events_total", "Lidarr webhook events received", ("event",))
+
+def _webhook_authorized(request: Request) -> bool:
+    token = request.query_params.get("token", "")
+    auth = request.headers.get("authorization", "")
+    if auth.lower().startswith("basic "):
+        try:
+            token = base64.b64decode(auth[6:]).decode().split(":", 1)[1]
+        except Exception:
+            pass
+    return hmac.compare_digest(token, WEBHOOK_TOKEN)
+
+async def invalidate_artist_images(*keys: Any):
+    stale = []
+    for k in keys:
+        if not k:
+            continue
+        ARTIST_IMAGE_CACHE.pop(str(k), None)
+        stale.append(f"artist:{k}")
+        v = artist_image_version(library.get(k))
+        if v:
+            stale.append(f"artist:{k}@{v}")
+        stale.extend(f"mediacover:{k}:{f}" for f in ("poster.jpg", "poster-500.jpg", "poster-250.jpg"))
+
+    def delete_all():
+        for key in stale:
+            image_cache.delete(key)
+
+    await asyncio.to_thread(delete_all)
+
+async def _refetch_artist(artist_id: Any):
+    r = await lidarr_get(f"/artist/{artist_id}", stale=False)
+    if r.status_code == 200:
+        library.upsert(r.json())
+
+@app.post("/hooks/lidarr")
+async def lidarr_webhook(request: Request):
+    """Apply Lidarr Connect → Webhook events to cached state, so caches can run
+    with long TTLs instead of re-polling the whole library."""
+    # /hooks/ bypasses the session check, so without a token it stays closed.
+    if not WEBHOOK_TOKEN:
+        return JSONResponse({"status": "error", "message": "Webhooks disabled (WEBHOOK_TOKEN unset)"}, status_code=403)
+    if not _webhook_authorized(request):
+        return JSONResponse({"status": "error", "message": "Unauthorized"}, status_code=401)
+    try:
+        event = await request.json()
+    except Exception:
+        return JSONResponse({"status": "error", "message": "Invalid JSON"}, status_code=400)
+    if not isinstance(event, dict):
+        return JSONResponse({"status": "error", "message": "Expected a JSON object"}, status_code=400)
+
+    kind = event.get("eventType") or "Unknown"
+    artist = event.get("artist") or {}
+    if not isinstance(artist, dict):
+        return JSONResponse({"status": "error", "message": "Invalid artist"}, status_code=400)
+    aid, mbid = artist.get("id"), artist.get("mbId") or artist.get("foreignArtistId")
+    webhook_events.inc(event=kind)
+    try:
+        if kind == "ArtistAdd" and aid:
+            lookups.invalidate()
+            await _refetch_artist(aid)
+        elif kind == "ArtistDelete" and aid:
+            await invalidate_artist_images(aid, mbid)
+            library.remove(aid)
+            lookups.invalidate()
+            album_status.invalidate(aid)
+        elif kind in ("Download", "ImportFailure", "AlbumDelete", "Retag") and aid:
+            album_status.invalidate(aid)
+            await _refetch_artist(aid)
+        elif kind == "Rename" and aid:
+            album_status.invalidate(aid)
+            await invalidate_artist_images(aid, mbid)
+            await _refetch_artist(aid)
+    except Exception as e:
+        print("lidarr_webhook error:", e)
+        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
+    return {"status": "ok", "event": kind}
+
+# =========================
+# METRICS ENDPOINT
+# =========================
+def _cache_samples(metric: str):
+    caches = {"image": image_cache, "lookup": lookups, "page": rendered_pages, "album_status": album_status}
+    return lambda: [({"cache": name}, getattr(c, metric)) for name, c in caches.items()]
+
+registry.callback("museerr_cache_hits_total", "Cache hits", "counter", _cache_samples("hits"))
+registry.callback("museerr_cache_misses_total", "Cache misses", "counter", _cache_samples("misses"))
+registry.callback("museerr_cache_evictions_total", "Cache evictions", "counter", _cache_samples("evictions"))
+registry.callback("museerr_image_cache_bytes", "Bytes held in the on-disk image cache", "gauge",
+                  lambda: [({}, image_cache.total)])
+registry.callback("museerr_library_artists", "Artists in the library index", "gauge",
+                  lambda: [({}, len(library.by_id))])
+registry.callback("museerr_library_age_seconds", "Seconds since the library index was loaded", "gauge",
+                  lambda: [({}, time.monotonic() - library.loaded_at + (library.restored_age or 0))]
+                  if library.loaded else [])
+registry.callback("museerr_upstream_circuit_open", "1 while the circuit for a Lidarr endpoint class is open or half-open",
+                  "gauge", lambda: [({"endpoint": n}, float(b.state != "closed")) for n, b in lidarr_breakers.by_name.items()])
+registry.callback("museerr_upstream_rejected_total", "Lidarr calls failed fast by an open circuit or full bulkhead",
+                  "counter", lambda: [({"endpoint": n}, b.rejected) for n, b in lidarr_breakers.by_name.items()])
+registry.callback("museerr_upstream_stale_served_total", "Lidarr responses answered from the last good copy",
+                  "counter", lambda: [({}, lidarr_stale.served)])
+registry.callback("museerr_upstream_stale_bytes", "Bytes of last good Lidarr responses kept for outages",
+                  "gauge", lambda: [({}, lidarr_stale.total)])
+registry.callback("museerr_album_search_commands_total", "AlbumSearch commands sent to Lidarr", "counter",
+                  lambda: [({}, album_searches.commands_sent)])
+registry.callback("museerr_album_search_albums_total", "Album search requests by outcome", "counter",
+                  lambda: [({"outcome": "sent"}, album_searches.albums_sent),
+                           ({"outcome": "already_queued"}, album_searches.albums_skipped)])
+
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        return Response(status_code=401)
+    return Response(registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # =========================
 # 404 HANDLER
 # =========================
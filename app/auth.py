@@ -0,0 +1,88 @@
+"""Session-cookie authentication as pure ASGI middleware.
+
+Unlike a ``BaseHTTPMiddleware`` this never wraps the response: it only
+looks at the request, then either hands the untouched ``send`` to the app
+(so streamed covers go straight through) or answers with a redirect.
+Public paths are matched against a precomputed set and prefix tuple, and
+verified cookies are remembered briefly so asset-heavy pages don't repeat
+the signature check and session-store read per request.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from starlette.requests import cookie_parser
+
+Session = Dict[str, Any]
+
+
+class VerifiedSessions:
+    """Small LRU of cookies that recently passed ``verify``.
+
+    Entries live for ``ttl`` seconds; ``forget`` drops one on logout. With
+    several workers, a session deleted elsewhere can stay accepted here for
+    up to ``ttl``."""
+
+    def __init__(self, verify: Callable[[Optional[str]], Optional[Session]], ttl: float = 30.0,
+                 max_entries: int = 1024):
+        self._verify = verify
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Session]]" = OrderedDict()
+        self.hits = self.misses = 0
+
+    def get(self, cookie: Optional[str]) -> Optional[Session]:
+        if not cookie:
+            return None
+        entry = self._entries.get(cookie)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        data = self._verify(cookie)
+        if data is None:
+            self._entries.pop(cookie, None)
+            return None
+        self._entries[cookie] = (now + self.ttl, data)
+        self._entries.move_to_end(cookie)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return data
+
+    def forget(self, cookie: Optional[str]):
+        if cookie:
+            self._entries.pop(cookie, None)
+
+
+def session_cookie(scope, name: str = "session") -> Optional[str]:
+    for k, v in scope["headers"]:
+        if k == b"cookie":
+            return cookie_parser(v.decode("latin-1")).get(name)
+    return None
+
+
+class AuthMiddleware:
+    def __init__(self, app, sessions: VerifiedSessions, public_paths: Iterable[str] = (),
+                 public_prefixes: Iterable[str] = (), login_path: str = "/login"):
+        self.app = app
+        self.sessions = sessions
+        self.public_paths = frozenset(public_paths)
+        self.public_prefixes = tuple(public_prefixes)
+        self.login_path = login_path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            # WebSocket handlers check the session themselves.
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if path in self.public_paths or path.startswith(self.public_prefixes):
+            return await self.app(scope, receive, send)
+        if self.sessions.get(session_cookie(scope)) is not None:
+            return await self.app(scope, receive, send)
+        await send({
+            "type": "http.response.start",
+            "status": 307,
+            "headers": [(b"location", self.login_path.encode()), (b"content-length", b"0")],
+        })
+        await send({"type": "http.response.body", "body": b""})
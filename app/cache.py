@@ -0,0 +1,139 @@
+"""In-memory caches for Lidarr lookup/search results and rendered pages.
+
+``/artist/lookup`` and ``/search`` are proxied to MusicBrainz by Lidarr and
+are by far the slowest upstream calls. ``LookupCache`` caches results per
+(endpoint, term); empty results are cached for a shorter time, and
+concurrent misses for the same key share one in-flight upstream request.
+"""
+import asyncio, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+class Stale(list):
+    """A fetch result built from stale upstream data (an outage fallback).
+    Callers get it like any other result, but caches don't keep it, so it
+    isn't served on after the upstream recovers. Caches call their
+    ``on_stale`` hook for each caller that receives one."""
+
+
+class LookupCache:
+    def __init__(
+        self,
+        fetch: Callable[[str, str], Awaitable[Optional[List[Any]]]],
+        ttl: float = 600.0,
+        negative_ttl: float = 60.0,
+        max_entries: int = 2048,
+        on_stale: Optional[Callable[[], None]] = None,
+    ):
+        self._fetch = fetch
+        self._on_stale = on_stale
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Key, Tuple[float, List[Any]]]" = OrderedDict()
+        self._inflight: Dict[Key, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = self.misses = self.evictions = 0
+
+    @staticmethod
+    def key(endpoint: str, term: str) -> Key:
+        return endpoint, " ".join(term.split()).lower()
+
+    def peek(self, endpoint: str, term: str) -> Optional[List[Any]]:
+        """Return a fresh cached result without touching upstream."""
+        k = self.key(endpoint, term)
+        entry = self._entries.get(k)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        self._entries.move_to_end(k)
+        return entry[1]
+
+    def put(self, endpoint: str, term: str, result: List[Any]):
+        k = self.key(endpoint, term)
+        ttl = self.ttl if result else self.negative_ttl
+        self._entries[k] = (time.monotonic() + ttl, result)
+        self._entries.move_to_end(k)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _load(self, endpoint: str, term: str) -> Optional[List[Any]]:
+        generation = self._generation
+        result = await self._fetch(endpoint, term)
+        # Upstream errors and outage fallbacks are not cached; the next caller
+        # retries. Nor is a result that raced an invalidation.
+        if result is not None and not isinstance(result, Stale) and generation == self._generation:
+            self.put(endpoint, term, result)
+        return result
+
+    async def get(self, endpoint: str, term: str) -> List[Any]:
+        cached = self.peek(endpoint, term)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        k = self.key(endpoint, term)
+        task = self._inflight.get(k)
+        if task is None:
+            task = asyncio.create_task(self._load(endpoint, term))
+            self._inflight[k] = task
+            task.add_done_callback(lambda _: self._inflight.pop(k, None))
+        result = await asyncio.shield(task)
+        # Tell every caller, not only the one whose request started the load.
+        if isinstance(result, Stale) and self._on_stale is not None:
+            self._on_stale()
+        return result if result is not None else []
+
+    def dump(self) -> List[Tuple[str, str, float, List[Any]]]:
+        """Unexpired entries as (endpoint, term, wall-clock expiry, result)."""
+        now, wall = time.monotonic(), time.time()
+        return [(k[0], k[1], wall + exp - now, result) for k, (exp, result) in self._entries.items() if exp > now]
+
+    def restore(self, entries: List[Tuple[str, str, float, List[Any]]]):
+        """Load entries from ``dump()``, keeping their original expiry."""
+        now, wall = time.monotonic(), time.time()
+        for endpoint, term, expires, result in entries:
+            if expires > wall and self.key(endpoint, term) not in self._entries:
+                self._entries[self.key(endpoint, term)] = (now + expires - wall, result)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, endpoint: Optional[str] = None):
+        self._generation += 1
+        if endpoint is None:
+            self._entries.clear()
+            return
+        for k in [k for k in self._entries if k[0] == endpoint]:
+            del self._entries[k]
+
+
+class RenderCache:
+    """Short-lived LRU of rendered pages, keyed by a hash of their inputs.
+
+    Keys already change whenever the data changes, so the TTL only bounds
+    how long unused pages linger."""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, html: str):
+        self._entries[key] = (time.monotonic() + self.ttl, html)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,138 @@
+"""Response compression as pure ASGI middleware.
+
+Compresses text responses (HTML, JSON, CSS, JS, SVG) with brotli when the
+client accepts it and the ``brotli`` package is installed, gzip otherwise.
+Images are left alone (already compressed), as is NDJSON so search results
+keep arriving line by line. Streamed bodies are compressed chunk by chunk
+with a flush after each, so progressive rendering still works.
+"""
+import zlib
+from typing import List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE = (
+    "text/html", "text/css", "text/plain", "text/javascript",
+    "application/json", "application/javascript", "application/manifest+json", "image/svg+xml",
+)
+
+
+def choose_encoding(accept: str) -> Optional[str]:
+    offered = {}
+    for part in accept.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        offered[name.strip().lower()] = q
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=min(level, 11))
+        else:
+            self._c = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.flush()
+        return self._c.compress(data) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 512, level: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            return await self.app(scope, receive, send)
+        accept = ""
+        for k, v in scope["headers"]:
+            if k == b"accept-encoding":
+                accept = v.decode("latin-1")
+        encoding = choose_encoding(accept)
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start: Optional[dict] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                media_type = headers.get(b"content-type", b"").split(b";")[0].decode("latin-1").strip()
+                passthrough = (
+                    message["status"] < 200 or message["status"] in (204, 304)
+                    or b"content-encoding" in headers
+                    or media_type not in COMPRESSIBLE
+                )
+                if passthrough:
+                    await send(message)
+                else:
+                    start = message  # held until we know the body size
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                held, start = start, None
+                if not more and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(held)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.level)
+                out = compressor.chunk(body) if more else compressor.finish(body)
+                await send({**held, "headers": _rewrite_headers(held.get("headers", []), encoding,
+                                                                None if more else len(out))})
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+                return
+            out = compressor.chunk(body) if more else compressor.finish(body)
+            if out or not more:
+                await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+def _rewrite_headers(headers: List[Tuple[bytes, bytes]], encoding: str, length: Optional[int]):
+    out = []
+    vary = None
+    for k, v in headers:
+        lk = k.lower()
+        if lk == b"content-length":
+            continue
+        if lk == b"etag" and not v.startswith(b"W/"):
+            v = b"W/" + v  # the compressed bytes differ from what a strong tag promised
+        if lk == b"vary":
+            vary = v
+            continue
+        out.append((k, v))
+    out.append((b"content-encoding", encoding.encode()))
+    out.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+    if length is not None:
+        out.append((b"content-length", str(length).encode()))
+    return out
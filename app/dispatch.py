@@ -0,0 +1,100 @@
+"""Batched AlbumSearch dispatch.
+
+Every AlbumSearch command makes Lidarr sweep all indexers, so clicking
+through a discography one album at a time costs one sweep per click.
+``SearchBatcher`` holds requests for a short window and sends them as a
+single command with many ``albumIds``, skipping albums Lidarr is already
+searching for or downloading.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+# Per-album outcomes reported back to callers.
+SEARCHING = "searching"      # included in a new AlbumSearch command
+ALREADY_QUEUED = "queued"    # Lidarr is already searching for / downloading it
+FAILED = "failed"            # the command could not be sent
+
+
+class SearchBatcher:
+    def __init__(
+        self,
+        send: Callable[[List[int]], Awaitable[bool]],
+        is_active: Callable[[str], bool],
+        refresh: Optional[Callable[[], Awaitable[None]]] = None,
+        window: float = 1.0,
+        max_batch: int = 100,
+    ):
+        self._send = send
+        self._is_active = is_active
+        self._refresh = refresh
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Flushes resolve every waiting caller; hold them so they can't be collected.
+        self._flushing: Set[asyncio.Task] = set()
+        self.commands_sent = 0
+        self.albums_sent = 0
+        self.albums_skipped = 0
+
+    async def request(self, album_ids: Iterable[Any]) -> Dict[str, str]:
+        """Queue ``album_ids`` for the next batch and wait for their outcome."""
+        loop = asyncio.get_running_loop()
+        waits: Dict[str, asyncio.Future] = {}
+        for album_id in album_ids:
+            key = str(album_id)
+            fut = self._pending.get(key)
+            if fut is None:
+                fut = self._pending[key] = loop.create_future()
+            waits[key] = fut
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._pending and self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+        if not waits:
+            return {}
+        results = await asyncio.gather(*(asyncio.shield(f) for f in waits.values()))
+        return dict(zip(waits, results))
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._flush(batch))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, batch: Dict[str, asyncio.Future]):
+        outcome: Dict[str, str] = {}
+        known = True
+        if self._refresh is not None:
+            try:
+                await self._refresh()
+            except Exception as e:
+                # Better a duplicate search than none at all.
+                print("album search refresh error:", e)
+                known = False
+        send = []
+        for key in batch:
+            if known and self._is_active(key):
+                outcome[key] = ALREADY_QUEUED
+            else:
+                send.append(key)
+        self.albums_skipped += len(batch) - len(send)
+        for i in range(0, len(send), self.max_batch):
+            chunk = send[i:i + self.max_batch]
+            try:
+                ok = await self._send([int(k) for k in chunk])
+            except Exception as e:
+                print("album search dispatch error:", e)
+                ok = False
+            if ok:
+                self.commands_sent += 1
+                self.albums_sent += len(chunk)
+            for key in chunk:
+                outcome[key] = SEARCHING if ok else FAILED
+        for key, fut in batch.items():
+            if not fut.done():
+                fut.set_result(outcome.get(key, FAILED))
@@ -0,0 +1,241 @@
+"""Content-addressed on-disk cache for cover art.
+
+Blobs are stored under ``<root>/blobs`` named by the SHA-256 of their bytes,
+which doubles as their ETag. Lookup keys (e.g. ``artist:42``) map to a blob
+through small files in ``<root>/keys``. The cache is capped at ``max_bytes``
+and evicts least-recently-used blobs; grid-sized thumbnails are derived once
+per blob and cached like any other entry.
+
+Several worker processes may share one directory. Each keeps its own view
+of the blobs, so a blob can disappear under a worker (another one evicted
+it) and is then treated as a miss. Hits bump blob mtimes, which gives every
+worker the same recency order, and the view is rebuilt from disk whenever a
+worker is about to evict or has written an eighth of the cap since its
+last scan, so the cap holds for the directory as a whole.
+
+All methods do blocking disk I/O; call them through ``asyncio.to_thread``.
+"""
+import hashlib, io, os, tempfile, threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it originals are served
+    Image = None
+
+
+class CachedImage(NamedTuple):
+    path: str
+    digest: str
+    media_type: str
+
+
+class ImageCache:
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self.key_dir = os.path.join(root, "keys")
+        self.enabled = False
+        self.total = 0
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._keys: Dict[str, CachedImage] = {}
+        self._digest_keys: Dict[str, Set[str]] = {}  # blob -> keys known to point at it
+        self._lock = threading.Lock()
+        self._written = 0  # bytes this process added since the last scan
+        self.hits = self.misses = self.evictions = 0
+
+    def load(self):
+        """Create the cache directories and rebuild LRU order from blob mtimes."""
+        try:
+            os.makedirs(self.blob_dir, exist_ok=True)
+            os.makedirs(self.key_dir, exist_ok=True)
+            self._scan()
+            self.enabled = True
+            self._evict()
+        except OSError as e:
+            print("image cache disabled:", e)
+            self.enabled = False
+
+    def _scan(self):
+        blobs = []
+        for sub in os.listdir(self.blob_dir):
+            d = os.path.join(self.blob_dir, sub)
+            for name in os.listdir(d):
+                if name.endswith(".tmp"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(d, name))
+                except FileNotFoundError:  # evicted by another worker meanwhile
+                    continue
+                blobs.append((st.st_mtime, name, st.st_size))
+        blobs.sort()
+        with self._lock:
+            self._lru = OrderedDict((name, size) for _, name, size in blobs)
+            self.total = sum(size for _, _, size in blobs)
+            self._written = 0
+        # Drop keys whose blob another worker evicted.
+        for name in os.listdir(self.key_dir):
+            if name.endswith(".tmp"):
+                continue
+            kp = os.path.join(self.key_dir, name)
+            try:
+                with open(kp) as f:
+                    digest = f.read().split("\n", 1)[0]
+                if not os.path.exists(self._blob_path(digest)):
+                    os.unlink(kp)
+            except OSError:
+                pass
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.key_dir, hashlib.sha1(key.encode()).hexdigest())
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        # A unique temp name per call: puts for the same key can run in
+        # several threads of one worker at once.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _remember(self, key: str, img: CachedImage):
+        old = self._keys.get(key)
+        self._keys[key] = img
+        with self._lock:
+            if old is not None and old.digest != img.digest:
+                self._digest_keys.get(old.digest, set()).discard(key)
+            self._digest_keys.setdefault(img.digest, set()).add(key)
+
+    def get(self, key: str) -> Optional[CachedImage]:
+        if not self.enabled:
+            return None
+        img = self._keys.get(key)
+        if img is None:
+            try:
+                with open(self._key_path(key)) as f:
+                    digest, media_type = f.read().split("\n", 1)
+                img = CachedImage(self._blob_path(digest), digest, media_type.strip())
+            except (OSError, ValueError):
+                self.misses += 1
+                return None
+        try:
+            size = os.stat(img.path).st_size
+        except OSError:
+            # Blob was evicted, possibly by another worker; drop the dangling key.
+            self.delete(key)
+            with self._lock:
+                self.total -= self._lru.pop(img.digest, 0)
+                self._digest_keys.pop(img.digest, None)
+            self.misses += 1
+            return None
+        with self._lock:
+            if img.digest in self._lru:
+                self._lru.move_to_end(img.digest)
+            else:  # written by another worker
+                self._lru[img.digest] = size
+                self.total += size
+        self._remember(key, img)
+        self.hits += 1
+        try:
+            os.utime(img.path)
+        except OSError:
+            pass
+        return img
+
+    def put(self, key: str, data: bytes, media_type: str) -> Optional[CachedImage]:
+        if not self.enabled or not data:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        try:
+            with self._lock:
+                known = digest in self._lru
+            if not known:
+                if os.path.exists(path):  # written by another worker
+                    os.utime(path)
+                    written = 0
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._write(path, data)
+                    written = len(data)
+                with self._lock:
+                    # Another thread may have added the same blob meanwhile.
+                    self.total += len(data) - self._lru.get(digest, 0)
+                    self._lru[digest] = len(data)
+                    self._written += written
+            self._write(self._key_path(key), f"{digest}\n{media_type}".encode())
+        except OSError as e:
+            print("image cache write error:", e)
+            return None
+        img = CachedImage(path, digest, media_type)
+        self._remember(key, img)
+        self._evict()
+        return img
+
+    def delete(self, key: str):
+        img = self._keys.pop(key, None)
+        if img is not None:
+            with self._lock:
+                self._digest_keys.get(img.digest, set()).discard(key)
+        try:
+            os.unlink(self._key_path(key))
+        except OSError:
+            pass
+
+    def _evict(self):
+        with self._lock:
+            rescan = self.total > self.max_bytes or self._written > self.max_bytes // 8
+        if rescan:
+            try:
+                self._scan()
+            except OSError as e:
+                print("image cache scan error:", e)
+        while True:
+            with self._lock:
+                if self.total <= self.max_bytes or len(self._lru) <= 1:
+                    return
+                digest, size = self._lru.popitem(last=False)
+                self.total -= size
+                keys = self._digest_keys.pop(digest, ())
+            self.evictions += 1
+            for path in [self._blob_path(digest)] + [self._key_path(k) for k in keys]:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            for k in keys:
+                self._keys.pop(k, None)
+
+    def thumbnail(self, img: CachedImage, width: int) -> CachedImage:
+        """Return a cached copy of ``img`` scaled down to ``width`` pixels wide.
+        Falls back to the original if Pillow is unavailable or decoding fails."""
+        if Image is None:
+            return img
+        key = f"thumb:{img.digest}:{width}"
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        try:
+            with Image.open(img.path) as im:
+                if im.width <= width:
+                    return img
+                im = im.convert("RGB")
+                im.thumbnail((width, width * 4))
+                buf = io.BytesIO()
+                im.save(buf, "JPEG", quality=82, optimize=True)
+        except Exception as e:
+            print("thumbnail error:", e)
+            return img
+        return self.put(key, buf.getvalue(), "image/jpeg") or img
@@ -0,0 +1,316 @@
+"""In-memory index of the Lidarr library.
+
+Holds every artist returned by ``GET /artist`` keyed by Lidarr id,
+foreignArtistId (MBID) and lowercased name, so routes can answer
+"is this in the library?" and "give me some artists" without downloading
+and scanning the full list on every request. The index refreshes itself in
+the background once its TTL has passed.
+"""
+import asyncio, bisect, random, time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from cache import Stale
+
+Artist = Dict[str, Any]
+
+
+def artist_name(a: Artist) -> str:
+    return (a.get("artistName") or (a.get("artistMetadata") or {}).get("name") or "").strip()
+
+
+def _id_key(a: Dict[str, Any]) -> int:
+    try:
+        return int(a.get("id") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# Sort keys for the precomputed library views. Each key ends with the Lidarr id
+# so keys are unique and can be used as keyset-pagination cursors.
+ARTIST_SORTS: Dict[str, Callable[[Artist], Tuple]] = {
+    "name": lambda a: (artist_name(a).lower(), _id_key(a)),
+    "added": lambda a: (a.get("added") or "", _id_key(a)),
+}
+
+ALBUM_SORTS: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    "title": lambda a: ((a.get("title") or "").lower(), _id_key(a)),
+    "released": lambda a: (a.get("releaseDate") or "", _id_key(a)),
+}
+
+
+def is_sort_key(key: Any) -> bool:
+    """Whether ``key`` (e.g. from a client-supplied cursor) has the shape every
+    ARTIST_SORTS/ALBUM_SORTS key has: (text, id)."""
+    return (
+        isinstance(key, (list, tuple)) and len(key) == 2
+        and isinstance(key[0], str) and isinstance(key[1], int) and not isinstance(key[1], bool)
+    )
+
+
+def sorted_view(items: List[Any], key: Callable[[Any], Tuple]) -> Tuple[List[Tuple], List[Any]]:
+    ordered = sorted(items, key=key)
+    return [key(x) for x in ordered], ordered
+
+
+def keyset_page(
+    view: Tuple[List[Tuple], List[Any]], after: Optional[Tuple] = None, limit: int = 50, desc: bool = False
+) -> Tuple[List[Any], Optional[Tuple]]:
+    """Return up to ``limit`` items following ``after`` in a sorted view, plus
+    the key to resume from (None on the last page). Stable across refreshes:
+    the cursor is a sort key, not an offset."""
+    keys, items = view
+    if not desc:
+        start = bisect.bisect_right(keys, after) if after is not None else 0
+        end = min(start + limit, len(items))
+        page = items[start:end]
+        more = end < len(items)
+    else:
+        end = bisect.bisect_left(keys, after) if after is not None else len(keys)
+        start = max(0, end - limit)
+        page = items[start:end][::-1]
+        more = start > 0
+    if not page or not more:
+        return page, None
+    return page, keys[end - 1] if not desc else keys[start]
+
+
+class LibraryIndex:
+    def __init__(self, fetch: Callable[[], Awaitable[Optional[List[Artist]]]], ttl: float = 300.0):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.artists: List[Artist] = []
+        self.by_id: Dict[str, Artist] = {}
+        self.by_mbid: Dict[str, Artist] = {}
+        self.by_name: Dict[str, Artist] = {}
+        self.views: Dict[str, Tuple[List[Tuple], List[Artist]]] = {
+            sort: ([], []) for sort in ARTIST_SORTS
+        }
+        self.loaded_at = 0.0
+        # Set while the data came from a warm-start snapshot rather than Lidarr.
+        self.restored_age: Optional[float] = None
+        # Called with no arguments after every load, e.g. to rebuild derived indexes.
+        self.listeners: List[Callable[[], None]] = []
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at > 0
+
+    @property
+    def stale(self) -> bool:
+        return self.restored_age is not None or time.monotonic() - self.loaded_at > self.ttl
+
+    def load(self, artists: List[Artist]):
+        """Rebuild all lookup tables from a full artist list and swap them in."""
+        by_id, by_mbid, by_name, named = {}, {}, {}, []
+        for a in artists:
+            if a.get("id") is not None:
+                by_id[str(a["id"])] = a
+            if a.get("foreignArtistId"):
+                by_mbid[str(a["foreignArtistId"])] = a
+            name = artist_name(a)
+            if name:
+                by_name.setdefault(name.lower(), a)
+                named.append(a)
+        views = {sort: sorted_view(named, key) for sort, key in ARTIST_SORTS.items()}
+        self.artists, self.by_id, self.by_mbid, self.by_name = named, by_id, by_mbid, by_name
+        self.views = views
+        self.loaded_at = time.monotonic()
+        self.restored_age = None
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                print("library listener error:", e)
+
+    def restore(self, artists: List[Artist], age: float) -> bool:
+        """Load a saved artist list that is ``age`` seconds old, unless a live
+        load already happened. It counts as stale, so the next
+        ``ensure_loaded`` revalidates it in the background."""
+        if self.loaded:
+            return False
+        self.load(artists)
+        self.restored_age = age
+        return True
+
+    def upsert(self, artist: Artist):
+        """Add or replace one artist (e.g. from a webhook) without a full fetch."""
+        if not self.loaded:
+            return  # the first full load will include it
+        key = str(artist.get("id"))
+        artists = [a for a in self.by_id.values() if str(a.get("id")) != key]
+        artists.append(artist)
+        self.load(artists)
+
+    def remove(self, artist_id: Any):
+        key = str(artist_id)
+        if key in self.by_id:
+            self.load([a for a in self.by_id.values() if str(a.get("id")) != key])
+
+    async def _do_refresh(self):
+        try:
+            artists = await self._fetch()
+            if artists is not None:
+                self.load(artists)
+        except Exception as e:
+            print("library refresh error:", e)
+
+    async def refresh(self):
+        """Refresh from Lidarr. Concurrent callers share one upstream fetch."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+        await asyncio.shield(self._refresh_task)
+
+    async def ensure_loaded(self):
+        """Block only for the very first load; afterwards stale data is served
+        while a refresh runs in the background."""
+        if not self.loaded:
+            await self.refresh()
+        elif self.stale and (self._refresh_task is None or self._refresh_task.done()):
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+
+    def get(self, key: Any) -> Optional[Artist]:
+        """Find an artist by Lidarr id or MBID."""
+        if key is None:
+            return None
+        k = str(key)
+        return self.by_id.get(k) or self.by_mbid.get(k)
+
+    def in_library(self, *keys: Any, name: Optional[str] = None) -> bool:
+        if any(self.get(k) is not None for k in keys):
+            return True
+        return bool(name) and name.lower() in self.by_name
+
+    def sample(self, k: int) -> List[Artist]:
+        return random.sample(self.artists, min(k, len(self.artists)))
+
+    def page(
+        self, sort: str = "name", after: Optional[Tuple] = None, limit: int = 50, desc: bool = False
+    ) -> Tuple[List[Artist], Optional[Tuple]]:
+        return keyset_page(self.views[sort], after, limit, desc)
+
+
+def album_downloaded(album: Dict[str, Any]) -> Optional[bool]:
+    """Download status from Lidarr's album statistics, or None if absent."""
+    st = album.get("statistics") or {}
+    if "trackFileCount" not in st:
+        return None
+    total = st.get("trackCount") or st.get("totalTrackCount") or 0
+    return total > 0 and st["trackFileCount"] >= total
+
+
+class AlbumStatusCache:
+    """Per-artist album list with a ``downloaded`` flag on every album.
+
+    Status comes from the album statistics Lidarr already returns with
+    ``/album?artistId=``; only when those are missing is a single artist-wide
+    ``/track?artistId=`` fetched. Either way an artist page costs at most two
+    upstream calls regardless of discography size, and results are cached,
+    least recently used first out once ``max_entries`` artists are held.
+    """
+
+    def __init__(
+        self,
+        fetch_albums: Callable[[Any], Awaitable[Optional[List[Dict[str, Any]]]]],
+        fetch_tracks: Callable[[Any], Awaitable[Optional[List[Dict[str, Any]]]]],
+        ttl: float = 120.0,
+        max_entries: int = 1024,
+        on_stale: Optional[Callable[[], None]] = None,
+    ):
+        self._fetch_albums = fetch_albums
+        self._fetch_tracks = fetch_tracks
+        self._on_stale = on_stale
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._generation = 0
+        self.hits = self.misses = self.evictions = 0
+
+    async def _load(self, artist_id: Any) -> Optional[List[Dict[str, Any]]]:
+        generation = self._generation
+        raw = await self._fetch_albums(artist_id)
+        if raw is None:
+            return None
+        stale = isinstance(raw, Stale)
+        albums = [dict(a) for a in raw]
+        missing = []
+        for a in albums:
+            a["downloaded"] = album_downloaded(a)
+            if a["downloaded"] is None:
+                missing.append(a)
+        if missing:
+            tracks = await self._fetch_tracks(artist_id) or []
+            stale = stale or isinstance(tracks, Stale)
+            by_album: Dict[str, List[bool]] = {}
+            for t in tracks:
+                by_album.setdefault(str(t.get("albumId")), []).append(bool(t.get("hasFile")))
+            for a in missing:
+                files = by_album.get(str(a.get("id")))
+                a["downloaded"] = all(files) if files else False
+        # Don't let a load that raced an invalidation, or one served from an
+        # outage fallback, populate the cache.
+        if stale:
+            return Stale(albums)
+        if generation == self._generation:
+            key = str(artist_id)
+            self._entries[key] = (time.monotonic(), albums)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return albums
+
+    def peek(self, artist_id: Any) -> Optional[List[Dict[str, Any]]]:
+        """The cached album list if it is still fresh, without loading."""
+        key = str(artist_id)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            return entry[1]
+        return None
+
+    async def get(self, artist_id: Any) -> List[Dict[str, Any]]:
+        key = str(artist_id)
+        entry = self._entries.get(key)
+        if entry and time.monotonic() - entry[0] <= self.ttl:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(artist_id))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        albums = await asyncio.shield(task)
+        if isinstance(albums, Stale) and self._on_stale is not None:
+            self._on_stale()
+        return albums if albums is not None else []
+
+    def invalidate(self, artist_id: Any = None):
+        self._generation += 1
+        if artist_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(str(artist_id), None)
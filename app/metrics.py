@@ -0,0 +1,156 @@
+"""Minimal Prometheus instrumentation (text exposition format 0.0.4).
+
+Counters, gauges and histograms with labels, plus callback collectors for
+values that already live elsewhere (e.g. cache hit counters). Values are
+per-process; with several workers each one reports its own.
+"""
+import bisect, threading
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, values: Dict[str, str]) -> LabelValues:
+        return tuple(str(values.get(l, "")) for l in self.labels)
+
+    def samples(self) -> Iterable[Sample]:
+        return []
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, doc, labels=()):
+        super().__init__(name, doc, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        k = self._key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for k, v in items:
+            yield self.name, dict(zip(self.labels, k)), v
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        k = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(k)
+            if row is None:
+                # per-bucket counts, then +Inf count, then sum
+                row = self._values[k] = [0.0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(k, list(row)) for k, row in self._values.items()]
+        for k, row in items:
+            base = dict(zip(self.labels, k))
+            cum = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), row[:-1]):
+                cum += n
+                yield f"{self.name}_bucket", {**base, "le": _fmt_value(le)}, cum
+            yield f"{self.name}_count", base, cum
+            yield f"{self.name}_sum", base, row[-1]
+
+
+class CallbackMetric(Metric):
+    """Reads its samples from ``fn`` at scrape time."""
+
+    def __init__(self, name, doc, kind: str, fn: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        super().__init__(name, doc)
+        self.kind = kind
+        self._fn = fn
+
+    def samples(self):
+        for labels, v in self._fn():
+            yield self.name, labels, v
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, doc, labels=()) -> Counter:
+        return self.register(Counter(name, doc, labels))
+
+    def gauge(self, name, doc, labels=()) -> Gauge:
+        return self.register(Gauge(name, doc, labels))
+
+    def histogram(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, doc, labels, buckets))
+
+    def callback(self, name, doc, kind, fn) -> CallbackMetric:
+        return self.register(CallbackMetric(name, doc, kind, fn))
+
+    def render(self) -> str:
+        out: List[str] = []
+        for m in self._metrics:
+            out.append(f"# HELP {m.name} {m.doc}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            try:
+                for name, labels, v in m.samples():
+                    out.append(f"{name}{_fmt_labels(labels)} {_fmt_value(v)}")
+            except Exception as e:
+                print(f"metrics: {m.name} collection error:", e)
+        return "\n".join(out) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
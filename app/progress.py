@@ -0,0 +1,209 @@
+"""Shared download-progress poller.
+
+One background task polls Lidarr's ``/queue`` and ``/command`` on a fixed
+interval, folds them into per-album progress and fans changes out to every
+subscriber (WebSocket clients, ``/status``). Upstream load is one pair of
+calls per interval no matter how many browsers are watching, and nothing is
+polled while nobody is.
+"""
+import asyncio, time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+Progress = Dict[str, Any]
+
+FINAL_STATES = ("completed", "failed", "not_found")
+_FAILED = {"failed", "failedPending", "importFailed"}
+_IMPORTING = {"importPending", "importing", "imported"}
+_WAITING = {"queued", "delay", "paused"}
+
+
+def album_progress(queue: List[Dict[str, Any]], commands: List[Dict[str, Any]]) -> Dict[str, Progress]:
+    """Fold queue records and AlbumSearch commands into progress per album id."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for rec in queue:
+        if rec.get("albumId") is not None:
+            grouped.setdefault(str(rec["albumId"]), []).append(rec)
+
+    out: Dict[str, Progress] = {}
+    for album_id, recs in grouped.items():
+        size = sum(float(r.get("size") or 0) for r in recs)
+        left = sum(float(r.get("sizeleft") or 0) for r in recs)
+        states = {r.get("trackedDownloadState") for r in recs} | {r.get("status") for r in recs}
+        if states & _FAILED:
+            status = "failed"
+        elif states & _IMPORTING:
+            status = "importing"
+        elif states <= (_WAITING | {None}):
+            status = "queued"
+        else:
+            status = "downloading"
+        album = (recs[0].get("album") or {})
+        out[album_id] = {
+            "album_id": album_id,
+            "status": status,
+            "progress": round(100.0 * (size - left) / size, 1) if size > 0 else 0.0,
+            "title": album.get("title") or recs[0].get("title"),
+        }
+
+    for cmd in commands:
+        if cmd.get("name") != "AlbumSearch":
+            continue
+        state = cmd.get("status")
+        if state not in ("queued", "started", "failed"):
+            continue
+        for album_id in (cmd.get("body") or {}).get("albumIds") or []:
+            key = str(album_id)
+            if key not in out:
+                out[key] = {
+                    "album_id": key,
+                    "status": "failed" if state == "failed" else "searching",
+                    "progress": 0.0,
+                    "title": None,
+                }
+    return out
+
+
+class QueuePoller:
+    def __init__(
+        self,
+        fetch_queue: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]],
+        fetch_commands: Callable[[], Awaitable[Optional[List[Dict[str, Any]]]]],
+        interval: float = 5.0,
+        idle_after: float = 30.0,
+    ):
+        self._fetch_queue = fetch_queue
+        self._fetch_commands = fetch_commands
+        self.interval = interval
+        self.idle_after = idle_after
+        self.state: Dict[str, Progress] = {}
+        self.commands: List[Dict[str, Any]] = []
+        self.polled_at = 0.0
+        self._watched: Dict[str, float] = {}  # album id -> when watch() added it
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._interest_at = 0.0
+        self._wake = asyncio.Event()
+        self._poll_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # -- subscriptions -------------------------------------------------
+    def subscribe(self, album_id: Any) -> asyncio.Queue:
+        key = str(album_id)
+        q: asyncio.Queue = asyncio.Queue(maxsize=16)
+        self._subscribers.setdefault(key, set()).add(q)
+        if key in self.state:
+            q.put_nowait(self.state[key])
+        self._wake.set()
+        return q
+
+    def unsubscribe(self, album_id: Any, q: asyncio.Queue):
+        subs = self._subscribers.get(str(album_id))
+        if subs is not None:
+            subs.discard(q)
+            if not subs:
+                self._subscribers.pop(str(album_id), None)
+
+    def touch(self):
+        """Record that someone is interested (e.g. a /status request)."""
+        if time.monotonic() - self._interest_at > self.idle_after:
+            self._wake.set()
+        self._interest_at = time.monotonic()
+
+    def active(self) -> List[str]:
+        return [k for k, v in self.state.items() if v["status"] not in FINAL_STATES]
+
+    def is_active(self, album_id: Any) -> bool:
+        p = self.state.get(str(album_id))
+        return p is not None and p["status"] not in FINAL_STATES
+
+    @property
+    def idle(self) -> bool:
+        return not self._subscribers and time.monotonic() - self._interest_at > self.idle_after
+
+    def _publish(self, progress: Progress):
+        for q in list(self._subscribers.get(progress["album_id"], ())):
+            if q.full():
+                try:
+                    q.get_nowait()  # slow client: drop its oldest update
+                except asyncio.QueueEmpty:
+                    pass
+            q.put_nowait(progress)
+
+    def watch(self, album_ids: List[Any]):
+        """Start tracking albums we just asked Lidarr to search for."""
+        for album_id in album_ids:
+            key = str(album_id)
+            if key not in self.state or self.state[key]["status"] in FINAL_STATES:
+                self.state[key] = {"album_id": key, "status": "searching", "progress": 0.0, "title": None}
+                self._watched[key] = time.monotonic()
+                self._publish(self.state[key])
+        self._interest_at = time.monotonic()
+        self._wake.set()
+
+    # -- polling -------------------------------------------------------
+    async def refresh(self, max_age: Optional[float] = None):
+        """Poll now unless the last poll is younger than ``max_age`` (default: one interval)."""
+        max_age = self.interval if max_age is None else max_age
+        async with self._poll_lock:
+            if time.monotonic() - self.polled_at > max_age:
+                await self._poll()
+
+    async def poll_once(self):
+        async with self._poll_lock:
+            await self._poll()
+
+    async def _poll(self):
+        started = time.monotonic()
+        queue, commands = await asyncio.gather(self._fetch_queue(), self._fetch_commands())
+        if queue is None or commands is None:
+            return
+        self.commands = commands
+        self.polled_at = time.monotonic()
+        current = album_progress(queue, commands)
+        for key, prev in list(self.state.items()):
+            if key in current:
+                self._watched.pop(key, None)
+                continue
+            if self._watched.get(key, 0.0) >= started:
+                # Watched after this poll's snapshot was taken, which can't
+                # know about the search yet; leave it to the next poll.
+                current[key] = prev
+                continue
+            self._watched.pop(key, None)
+            if prev["status"] in FINAL_STATES:
+                self.state.pop(key, None)
+                continue
+            # Gone from queue and commands: it finished (or the search found nothing).
+            final = "not_found" if prev["status"] == "searching" else "completed"
+            current[key] = {**prev, "status": final, "progress": 100.0 if final == "completed" else 0.0}
+        for key, progress in current.items():
+            if self.state.get(key) != progress:
+                self._publish(progress)
+        self.state = current
+
+    async def _run(self):
+        while True:
+            if self.idle:
+                self._wake.clear()
+                await self._wake.wait()
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print("queue poll error:", e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,162 @@
+"""Circuit breakers, bulkheads and stale responses for upstream outages.
+
+Each Lidarr endpoint class (artist, album, lookup, command, ...) gets its
+own ``Breaker``: a failure counter that opens the circuit after repeated
+errors so calls fail fast instead of waiting out a timeout, plus a
+semaphore (bulkhead) that bounds how many calls to that class can be in
+flight, so one slow endpoint cannot tie up every worker. While a call
+fails or its circuit is open, ``StaleStore`` can hand back the last good
+response for the same request.
+
+Whether the current request was served degraded is tracked in a context
+variable holding a mutable flag, so it survives the task hops made by
+middleware and single-flight loaders.
+"""
+import asyncio, contextvars, time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling upstream while its circuit is open or its bulkhead is full."""
+
+    def __init__(self, name: str, reason: str = "circuit open"):
+        super().__init__(f"{name}: {reason}")
+        self.name = name
+        self.reason = reason
+
+
+class Breaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_after: float = 30.0,
+        max_concurrent: int = 16,
+        queue_timeout: float = 2.0,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.queue_timeout = queue_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._slots = asyncio.Semaphore(max_concurrent)
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_after:
+            self.state = HALF_OPEN
+        # Half-open: let a single probe through; everyone else fails fast.
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                print(f"circuit {self.name}: open after {self.failures} failures")
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    @asynccontextmanager
+    async def call(self):
+        """Reserve a bulkhead slot for one upstream call; raises ``CircuitOpen``
+        when the circuit is open or no slot frees up within ``queue_timeout``."""
+        if not self.allow():
+            self.rejected += 1
+            raise CircuitOpen(self.name)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._probing = False
+            self.rejected += 1
+            raise CircuitOpen(self.name, "bulkhead full")
+        try:
+            yield
+        finally:
+            self._probing = False
+            self._slots.release()
+
+
+class StaleStore:
+    """Last good response body per request, LRU-bounded by entry count and
+    by the total size of the bodies kept."""
+
+    def __init__(self, max_entries: int = 1024, max_body: int = 1 << 20, max_bytes: int = 64 << 20):
+        self.max_entries = max_entries
+        self.max_body = max_body
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Any, Tuple[int, Any]]" = OrderedDict()
+        self.total = 0
+        self.served = 0
+
+    def put(self, key: Any, value: Any, size: int = 0):
+        if size > self.max_body:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total -= old[0]
+        self._entries[key] = (size, value)
+        self.total += size
+        while len(self._entries) > self.max_entries or self.total > self.max_bytes:
+            _, (dropped, _) = self._entries.popitem(last=False)
+            self.total -= dropped
+
+    def get(self, key: Any) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        self.served += 1
+        return entry[1]
+
+
+class Breakers:
+    """One breaker per endpoint class, created on first use."""
+
+    def __init__(self, **defaults: Any):
+        self._defaults = defaults
+        self.by_name: Dict[str, Breaker] = {}
+
+    def get(self, name: str) -> Breaker:
+        b = self.by_name.get(name)
+        if b is None:
+            b = self.by_name[name] = Breaker(name, **self._defaults)
+        return b
+
+
+_degraded: contextvars.ContextVar[Optional[Dict[str, bool]]] = contextvars.ContextVar("degraded", default=None)
+
+
+def begin_request() -> Dict[str, bool]:
+    """Start tracking degraded mode for the current request."""
+    holder = {"degraded": False}
+    _degraded.set(holder)
+    return holder
+
+
+def mark_degraded():
+    holder = _degraded.get()
+    if holder is not None:
+        holder["degraded"] = True
+
+
+def is_degraded() -> bool:
+    holder = _degraded.get()
+    return bool(holder and holder["degraded"])
@@ -0,0 +1,163 @@
+"""Pluggable login session storage.
+
+Every backend hands out an HMAC-signed cookie value and enforces the same
+expiry, so the app can switch between them with ``SESSION_BACKEND``:
+
+- ``memory``: process-local dict; sessions die with the worker.
+- ``sqlite``: a WAL-mode SQLite file shared by all workers/containers that
+  mount the same volume; survives restarts.
+- ``cookie``: stateless; the session itself lives in the signed cookie, so
+  any worker with the same SECRET_KEY can verify it. The signature is then
+  all that protects a session, so this backend refuses the default key.
+"""
+import base64, hashlib, hmac, json, os, secrets, sqlite3, threading, time
+from typing import Any, Dict, Optional
+
+Session = Dict[str, Any]
+
+# The SECRET_KEY placeholder shipped in the docs and compose file.
+DEFAULT_SECRET = "change-me"
+
+
+class SessionStore:
+    def __init__(self, secret: str, ttl: float):
+        self._key = secret.encode()
+        self.ttl = ttl
+
+    def sign(self, v: str) -> str:
+        return hmac.new(self._key, v.encode(), hashlib.sha256).hexdigest()
+
+    def unsign(self, cookie: Optional[str]) -> Optional[str]:
+        """Return the signed value if the signature checks out."""
+        if not cookie or "." not in cookie:
+            return None
+        v, sig = cookie.rsplit(".", 1)
+        return v if hmac.compare_digest(self.sign(v), sig) else None
+
+    def expired(self, data: Session) -> bool:
+        return time.time() - data.get("ts", 0) > self.ttl
+
+    def create(self, data: Session) -> str:
+        sid = secrets.token_urlsafe(24)
+        self._save(sid, {**data, "ts": time.time()})
+        return f"{sid}.{self.sign(sid)}"
+
+    def get(self, cookie: Optional[str]) -> Optional[Session]:
+        sid = self.unsign(cookie)
+        if sid is None:
+            return None
+        data = self._load(sid)
+        if data is None or self.expired(data):
+            return None
+        return data
+
+    def delete(self, cookie: Optional[str]):
+        sid = self.unsign(cookie)
+        if sid is not None:
+            self._delete(sid)
+
+    def sweep(self) -> int:
+        """Drop expired sessions; returns how many were removed."""
+        return 0
+
+    def _save(self, sid: str, data: Session):
+        raise NotImplementedError
+
+    def _load(self, sid: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def _delete(self, sid: str):
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, secret: str, ttl: float):
+        super().__init__(secret, ttl)
+        self._sessions: Dict[str, Session] = {}
+
+    def _save(self, sid, data):
+        self._sessions[sid] = data
+
+    def _load(self, sid):
+        return self._sessions.get(sid)
+
+    def _delete(self, sid):
+        self._sessions.pop(sid, None)
+
+    def sweep(self):
+        dead = [sid for sid, d in list(self._sessions.items()) if self.expired(d)]
+        for sid in dead:
+            self._sessions.pop(sid, None)
+        return len(dead)
+
+
+class SqliteSessionStore(SessionStore):
+    def __init__(self, secret: str, ttl: float, path: str):
+        super().__init__(secret, ttl)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, ts REAL NOT NULL)"
+            )
+            # Sessions written by earlier versions carried the Navidrome password.
+            self._db.execute("DELETE FROM sessions WHERE data LIKE '%\"p\":%'")
+
+    def _save(self, sid, data):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions (sid, data, ts) VALUES (?, ?, ?)",
+                (sid, json.dumps(data), data["ts"]),
+            )
+
+    def _load(self, sid):
+        with self._lock:
+            row = self._db.execute("SELECT data FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _delete(self, sid):
+        with self._lock:
+            self._db.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self):
+        with self._lock:
+            cur = self._db.execute("DELETE FROM sessions WHERE ts < ?", (time.time() - self.ttl,))
+        return cur.rowcount
+
+
+class CookieSessionStore(SessionStore):
+    """Stateless sessions. Only the username and timestamp go into the cookie;
+    the password is never sent back to the browser. Logout clears the cookie
+    client-side; a copied cookie stays valid until it expires."""
+
+    def create(self, data):
+        payload = {"u": data.get("u"), "ts": time.time()}
+        raw = base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+        return f"{raw}.{self.sign(raw)}"
+
+    def _load(self, sid):
+        try:
+            return json.loads(base64.urlsafe_b64decode(sid + "=" * (-len(sid) % 4)))
+        except ValueError:
+            return None
+
+    def _delete(self, sid):
+        pass
+
+
+def make_store(backend: str, secret: str, ttl: float, path: str) -> SessionStore:
+    backend = backend.lower()
+    if backend == "cookie":
+        if not secret or secret == DEFAULT_SECRET:
+            # Anyone could sign a session of their own.
+            raise ValueError("SESSION_BACKEND=cookie requires SECRET_KEY to be set to a private value")
+        return CookieSessionStore(secret, ttl)
+    if backend == "sqlite":
+        try:
+            return SqliteSessionStore(secret, ttl, path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"session store: cannot open {path} ({e}); falling back to memory")
+    return MemorySessionStore(secret, ttl)
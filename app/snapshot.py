@@ -0,0 +1,56 @@
+"""Warm-start snapshot of cached upstream state.
+
+A gzip'd JSON file holding whatever the app has learned from Lidarr (the
+library index, profile ids, lookup results, resolved cover URLs), written
+periodically and read back at startup so a fresh process starts warm.
+Everything restored is treated as stale and revalidated in the background.
+
+A snapshot is ignored if its format version differs, if it was taken
+against a different Lidarr, or if it is older than ``max_age``.
+"""
+import gzip, json, os, tempfile, time
+from typing import Any, Dict, Optional
+
+# Bump when the layout of any section changes incompatibly.
+SNAPSHOT_VERSION = 1
+
+
+def save(path: str, source: str, sections: Dict[str, Any]):
+    """Atomically write ``sections`` to ``path``."""
+    doc = {"version": SNAPSHOT_VERSION, "source": source, "saved_at": time.time(), **sections}
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=5) as f:
+            f.write(json.dumps(doc, separators=(",", ":")).encode())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def load(path: str, source: str, max_age: float) -> Optional[Dict[str, Any]]:
+    """Read a snapshot, or None if it is missing, unreadable or doesn't apply."""
+    try:
+        with gzip.open(path, "rb") as f:
+            doc = json.loads(f.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"snapshot: cannot read {path} ({e}); starting cold")
+        return None
+    if not isinstance(doc, dict) or doc.get("version") != SNAPSHOT_VERSION:
+        print("snapshot: format version mismatch; starting cold")
+        return None
+    if doc.get("source") != source:
+        print("snapshot: taken against a different Lidarr; starting cold")
+        return None
+    age = time.time() - float(doc.get("saved_at") or 0)
+    if age > max_age:
+        print(f"snapshot: {int(age)}s old; starting cold")
+        return None
+    doc["age"] = max(0.0, age)
+    return doc
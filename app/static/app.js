@@ -9,7 +9,12 @@ document.addEventListener("DOMContentLoaded", () => {
   // ------------------------------
   // Helpers
   // ------------------------------
+  // One socket per task: /status refreshes must not pile up duplicates.
+  const sockets = {};
+
   function trackProgress(taskId) {
+    const open = sockets[taskId];
+    if (open && open.readyState <= WebSocket.OPEN) return;
     const ws = new WebSocket(
       (location.protocol === "https:" ? "wss://" : "ws://") +
         location.host +
@@ -41,15 +46,20 @@ document.addEventListener("DOMContentLoaded", () => {
         setTimeout(() => ws.close(), 1500);
       }
 
-      if (data.status === "failed" && wrapper) {
+      if ((data.status === "failed" || data.status === "not_found") && wrapper) {
         wrapper.classList.add("error");
-        if (pct) pct.textContent = "Failed";
+        if (pct) pct.textContent = data.status === "failed" ? "Failed" : "Not found";
         ws.close();
       }
     };
 
-    ws.onclose = () => console.log(`🔌 WebSocket closed for ${taskId}`);
+    ws.onclose = () => {
+      if (sockets[taskId] === ws) delete sockets[taskId];
+      console.log(`🔌 WebSocket closed for ${taskId}`);
+    };
+    sockets[taskId] = ws;
   }
+  window.trackProgress = trackProgress;
 
   // ------------------------------
   // Single Track Download
@@ -163,9 +173,13 @@ document.addEventListener("DOMContentLoaded", () => {
   // ------------------------------
   // Global refresh for active tasks
   // ------------------------------
+  // Only albums this page shows a progress bar for need a socket.
   async function refreshActive() {
+    const ids = [...document.querySelectorAll('[id^="progress-"]')]
+      .map((el) => el.id.slice("progress-".length));
+    if (!ids.length) return;
     try {
-      const res = await fetch("/status");
+      const res = await fetch("/status?ids=" + encodeURIComponent(ids.join(",")));
       const data = await res.json();
       if (data.active && data.active.length) {
         data.active.forEach(trackProgress);
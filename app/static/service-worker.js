@@ -1,6 +1,13 @@
 // Museerr Smart Service Worker
-const CACHE_VERSION = 'v3-' + Date.now(); // Forces update each new build
-const CACHE_NAME = `museerr-${CACHE_VERSION}`;
+// /service-worker.js fills in CACHE_VERSION with a hash of the static files
+// and templates, so caches roll over exactly when a deploy changes them.
+const CACHE_VERSION = '__CACHE_VERSION__';
+const SHELL_CACHE = `museerr-shell-${CACHE_VERSION}`;
+const PAGE_CACHE = `museerr-pages-${CACHE_VERSION}`;
+// Cover URLs are versioned or content-addressed, so covers outlive deploys.
+const COVER_CACHE = 'museerr-covers-v1';
+const MAX_COVERS = 400;
+const MAX_PAGES = 100;
 
 const APP_SHELL = [
   '/',
@@ -18,7 +25,7 @@ const APP_SHELL = [
 self.addEventListener('install', (event) => {
   self.skipWaiting();
   event.waitUntil(
-    caches.open(CACHE_NAME)
+    caches.open(SHELL_CACHE)
       .then(cache => cache.addAll(APP_SHELL))
       .catch(err => console.warn('[SW] Install failed:', err))
   );
@@ -28,10 +35,11 @@ self.addEventListener('install', (event) => {
 // Activate — Clean old caches
 // ------------------------------
 self.addEventListener('activate', (event) => {
+  const keep = [SHELL_CACHE, PAGE_CACHE, COVER_CACHE];
   event.waitUntil(
     caches.keys().then(keys => Promise.all(
       keys.map(k => {
-        if (!k.startsWith(CACHE_NAME.split('-')[0])) {
+        if (k.startsWith('museerr') && !keep.includes(k)) {
           console.log('[SW] Deleting old cache:', k);
           return caches.delete(k);
         }
@@ -42,49 +50,148 @@ self.addEventListener('activate', (event) => {
 });
 
 // ------------------------------
-// Fetch Handler — Smarter Strategy
+// Helpers
 // ------------------------------
 function isHTML(request) {
   return request.headers.get('accept')?.includes('text/html');
 }
 
+// Only keep real answers: not login redirects, errors or outage fallbacks.
+function cacheable(resp) {
+  return resp && resp.ok && !resp.redirected && resp.type === 'basic'
+    && !resp.headers.get('X-Museerr-Degraded');
+}
+
+// Caches keep insertion order, so the first keys are the oldest entries.
+const trimming = {};
+function trimCache(name, max) {
+  if (trimming[name]) return;
+  trimming[name] = setTimeout(async () => {
+    delete trimming[name];
+    const cache = await caches.open(name);
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(0, keys.length - max)).map(k => cache.delete(k)));
+  }, 1000);
+}
+
+async function put(name, req, resp, max) {
+  const cache = await caches.open(name);
+  await cache.put(req, resp);
+  if (max) trimCache(name, max);
+}
+
+function isCover(url, req) {
+  return url.pathname === '/artist/image' || url.pathname === '/image/remote'
+    || url.pathname.startsWith('/config/MediaCover/') || req.destination === 'image';
+}
+
+function isSWR(url) {
+  return url.pathname === '/discover/random'
+    || url.pathname.startsWith('/artist/') || url.pathname.startsWith('/album/');
+}
+
+// Serve the cached copy at once and refresh it in the background. The
+// refresh is conditional, so an unchanged page costs the server a 304.
+// Redirects (an expired session bouncing to /login) pass straight through
+// and drop the cached copy.
+async function staleWhileRevalidate(event, req) {
+  const cache = await caches.open(PAGE_CACHE);
+  const cached = await cache.match(req);
+  const etag = cached && cached.headers.get('ETag');
+  let conditional = req;
+  if (etag) {
+    const headers = new Headers(req.headers);
+    headers.set('If-None-Match', etag);
+    // Keeps the original redirect mode ('manual' for navigations).
+    conditional = new Request(req, { headers });
+  }
+  const refresh = fetch(conditional)
+    .then(resp => {
+      if (resp.type === 'opaqueredirect' || resp.redirected) {
+        cache.delete(req);
+      } else if (cacheable(resp)) {
+        put(PAGE_CACHE, req, resp.clone(), MAX_PAGES);
+      } else if (resp.status === 304 && cached) {
+        return cached;
+      }
+      return resp;
+    });
+  if (cached) {
+    event.waitUntil(refresh.catch(() => {}));
+    return cached;
+  }
+  return refresh;
+}
+
+async function coverFirst(req) {
+  const cache = await caches.open(COVER_CACHE);
+  const cached = await cache.match(req);
+  if (cached) return cached;
+  const resp = await fetch(req);
+  if (cacheable(resp)) put(COVER_CACHE, req, resp.clone(), MAX_COVERS);
+  return resp;
+}
+
+// ------------------------------
+// Fetch Handler — Smarter Strategy
+// ------------------------------
 self.addEventListener('fetch', (event) => {
   const req = event.request;
   const url = new URL(req.url);
 
-  if (url.pathname.startsWith('/api') || url.pathname.startsWith('/ws')) return;
+  if (url.origin !== self.location.origin) return;
+
+  // Adding an artist or starting a search changes the pages it redirects
+  // back to, so don't let the cached copies answer.
+  if (req.method !== 'GET') {
+    event.respondWith(caches.delete(PAGE_CACHE).then(() => fetch(req)));
+    return;
+  }
+  if (url.pathname.startsWith('/api') || url.pathname.startsWith('/ws')
+      || url.pathname === '/status' || url.pathname === '/metrics') return;
+
+  if (url.pathname === '/logout') {
+    event.respondWith(caches.delete(PAGE_CACHE).then(() => fetch(req)));
+    return;
+  }
+
+  if (isCover(url, req)) {
+    event.respondWith(coverFirst(req).catch(() => caches.match('/static/icons/icon-192.png')));
+    return;
+  }
+
+  if (isSWR(url)) {
+    event.respondWith(staleWhileRevalidate(event, req).catch(() => caches.match(req)));
+    return;
+  }
 
   if (isHTML(req)) {
     event.respondWith(
       fetch(req)
         .then(resp => {
-          const copy = resp.clone();
-          caches.open(CACHE_NAME).then(cache => cache.put(req, copy));
+          if (cacheable(resp)) put(SHELL_CACHE, req, resp.clone());
           return resp;
         })
-        .catch(() => caches.match(req))
+        .catch(() => caches.match(req).then(r => r || caches.match('/')))
     );
     return;
   }
 
-  if (url.pathname.startsWith('/static/')) {
+  if (url.pathname.startsWith('/static/') || url.pathname === '/manifest.webmanifest') {
     event.respondWith(
-      fetch(req)
-        .then(resp => {
-          const copy = resp.clone();
-          caches.open(CACHE_NAME).then(cache => cache.put(req, copy));
+      caches.match(req).then(cached => {
+        const refresh = fetch(req).then(resp => {
+          if (cacheable(resp)) put(SHELL_CACHE, req, resp.clone());
           return resp;
-        })
-        .catch(() => caches.match(req))
+        });
+        if (cached) {
+          event.waitUntil(refresh.catch(() => {}));
+          return cached;
+        }
+        return refresh;
+      })
     );
-    return;
   }
-
-  event.respondWith(
-    caches.match(req)
-      .then(cached => cached || fetch(req))
-      .catch(() => caches.match('/'))
-  );
 });
 
 self.addEventListener('message', (event) => {
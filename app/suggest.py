@@ -0,0 +1,131 @@
+"""In-process fuzzy index over library artist and album names for typeahead.
+
+Names are normalised (diacritics stripped, casefolded, punctuation collapsed)
+and indexed two ways: a sorted word list for prefix matches, which is what
+most keystrokes hit, and trigram postings for typo-tolerant matching once the
+query is three characters or longer. Queries never touch Lidarr.
+"""
+import bisect, heapq, re, unicodedata
+from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Trigram postings longer than this are skipped: they would dominate query
+# time without narrowing the candidates, and prefix matching covers them.
+MAX_POSTING = 2000
+MAX_PREFIX_CANDIDATES = 500
+
+
+def normalize(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).casefold()
+    return _NON_ALNUM.sub(" ", s).strip()
+
+
+def trigrams(norm: str) -> Set[str]:
+    padded = f"  {norm} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Entry(NamedTuple):
+    kind: str
+    id: Any
+    label: str
+    norm: str
+    extra: Dict[str, Any]
+
+
+class _Snapshot(NamedTuple):
+    entries: List[Entry]
+    gram_counts: List[int]
+    postings: Dict[str, List[int]]
+    words: List[Tuple[str, int]]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._index = _Snapshot([], [], {}, [])
+
+    def __len__(self) -> int:
+        return len(self._index.entries)
+
+    def build(self, artists: Iterable[Tuple[Any, str]], albums: Iterable[Tuple[Any, str, Dict[str, Any]]]):
+        """Rebuild from (id, name) artists and (id, title, extra) albums.
+        Builds a new snapshot and swaps it in with one assignment; queries
+        read ``_index`` once, so they see either the old or the new index."""
+        entries: List[Entry] = []
+        for id_, name in artists:
+            if name:
+                entries.append(Entry("artist", id_, name, normalize(name), {}))
+        for id_, title, extra in albums:
+            if title:
+                entries.append(Entry("album", id_, title, normalize(title), extra))
+
+        postings: Dict[str, List[int]] = {}
+        words: List[Tuple[str, int]] = []
+        counts: List[int] = []
+        for i, e in enumerate(entries):
+            grams = trigrams(e.norm)
+            counts.append(len(grams))
+            for g in grams:
+                postings.setdefault(g, []).append(i)
+            for w in set(e.norm.split()):
+                words.append((w, i))
+        words.sort()
+        self._index = _Snapshot(entries, counts, postings, words)
+
+    @staticmethod
+    def _prefix_candidates(index: _Snapshot, nq: str) -> Set[int]:
+        # Match the last (possibly partial) word; earlier words must appear too.
+        parts = nq.split()
+        last = parts[-1]
+        lo = bisect.bisect_left(index.words, (last, -1))
+        out: Set[int] = set()
+        for w, i in index.words[lo:lo + MAX_PREFIX_CANDIDATES]:
+            if not w.startswith(last):
+                break
+            out.add(i)
+        if len(parts) > 1:
+            out = {i for i in out if all(p in index.entries[i].norm for p in parts[:-1])}
+        return out
+
+    def query(self, q: str, limit: int = 8) -> List[Dict[str, Any]]:
+        nq = normalize(q)
+        index = self._index
+        entries = index.entries
+        if not nq or not entries:
+            return []
+        prefix = self._prefix_candidates(index, nq)
+
+        shared: Dict[int, int] = {}
+        qgrams: Set[str] = set()
+        if len(nq) >= 3:
+            qgrams = trigrams(nq)
+            for g in qgrams:
+                posting = index.postings.get(g, ())
+                if len(posting) > MAX_POSTING:
+                    continue
+                for i in posting:
+                    shared[i] = shared.get(i, 0) + 1
+
+        def score(i: int) -> float:
+            e = entries[i]
+            s = 0.0
+            if qgrams:
+                n = shared.get(i, 0)
+                # Jaccard similarity; weighted so prefix matches and kind dominate.
+                s = 0.5 * n / (len(qgrams) + index.gram_counts[i] - n)
+            if e.norm.startswith(nq):
+                s += 1.0
+            elif i in prefix:
+                s += 0.5
+            if e.kind == "artist":
+                s += 0.25
+            return s
+
+        # Require a reasonable trigram overlap for fuzzy-only candidates.
+        min_shared = max(1, len(qgrams) // 3)
+        candidates = prefix | {i for i, n in shared.items() if n >= min_shared}
+        best = heapq.nlargest(limit, candidates, key=lambda i: (score(i), -len(entries[i].norm)))
+        return [{"type": entries[i].kind, "id": entries[i].id, "label": entries[i].label, **entries[i].extra}
+                for i in best]
@@ -0,0 +1,305 @@
+"""Fake Lidarr (and Navidrome ping) for load-testing Museerr.
+
+Serves a synthetic, deterministic library of artists, albums, tracks and
+cover images from the Lidarr v1 endpoints Museerr uses, with configurable
+per-endpoint latency. Every request is counted per endpoint class; read the
+counters from ``GET /_stats`` and clear them with ``POST /_stats/reset``.
+
+    python bench/fake_lidarr.py --port 8686 --artists 5000 --latency lookup=0.8 --latency search=1.5
+"""
+import argparse, asyncio, random, struct, time, uuid, zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+# Endpoint classes used for latency injection and call counting.
+ENDPOINT_CLASSES = (
+    "artist", "album", "track", "lookup", "search", "mediacover", "cover",
+    "command", "queue", "profile", "navidrome", "other",
+)
+
+_WORDS = (
+    "black crystal velvet neon silent golden broken electric midnight paper wild hollow "
+    "northern lunar iron glass ocean echo burning static violet summer winter fever "
+    "river ghost signal radio shadow atlas cobalt ember orchid canyon harbor"
+).split()
+
+
+def classify(path: str) -> str:
+    p = path[len("/api/v1"):] if path.startswith("/api/v1") else path
+    if p.startswith("/artist/lookup"):
+        return "lookup"
+    for prefix, cls in (
+        ("/search", "search"), ("/mediacover", "mediacover"), ("/covers", "cover"),
+        ("/artist", "artist"), ("/album", "album"), ("/track", "track"), ("/command", "command"),
+        ("/queue", "queue"), ("/qualityprofile", "profile"), ("/metadataprofile", "profile"),
+        ("/rest", "navidrome"),
+    ):
+        if p.startswith(prefix):
+            return cls
+    return "other"
+
+
+def png(rgb, size: int = 64) -> bytes:
+    """Encode a solid-colour RGB PNG without any imaging library."""
+    row = b"\x00" + bytes(rgb) * size
+    raw = zlib.compress(row * size)
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    ihdr = struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", raw) + chunk(b"IEND", b"")
+
+
+class Library:
+    """Deterministic synthetic library: same seed and sizes, same ids and names."""
+
+    def __init__(self, artists: int = 1000, albums_per_artist: int = 8, tracks_per_album: int = 10,
+                 downloaded_ratio: float = 0.6, seed: int = 1):
+        rng = random.Random(seed)
+        self.tracks_per_album = tracks_per_album
+        self.artists: List[Dict[str, Any]] = []
+        self.albums: List[Dict[str, Any]] = []
+        self.albums_by_artist: Dict[int, List[Dict[str, Any]]] = {}
+        album_id = 0
+        for aid in range(1, artists + 1):
+            name = " ".join(rng.choice(_WORDS).title() for _ in range(rng.randint(1, 3))) + f" {aid}"
+            n_albums = max(1, int(rng.gauss(albums_per_artist, albums_per_artist / 3)))
+            artist = {
+                "id": aid,
+                "artistName": name,
+                "foreignArtistId": str(uuid.UUID(int=rng.getrandbits(128))),
+                "added": f"20{rng.randint(18, 25)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00Z",
+                "monitored": True,
+                "images": [{"coverType": "poster", "url": f"/MediaCover/Artist/{aid}/poster.jpg?lastWrite={aid}"}],
+                "statistics": {"albumCount": n_albums, "trackCount": 0, "trackFileCount": 0},
+            }
+            albums = []
+            for _ in range(n_albums):
+                album_id += 1
+                total = max(1, int(rng.gauss(tracks_per_album, 3)))
+                files = total if rng.random() < downloaded_ratio else rng.randint(0, total - 1)
+                albums.append({
+                    "id": album_id,
+                    "artistId": aid,
+                    "title": " ".join(rng.choice(_WORDS).title() for _ in range(rng.randint(1, 4))),
+                    "foreignAlbumId": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "releaseDate": f"{rng.randint(1965, 2025)}-01-01T00:00:00Z",
+                    "albumType": rng.choice(["Album", "Album", "EP", "Single"]),
+                    "monitored": True,
+                    "statistics": {"trackCount": total, "trackFileCount": files, "totalTrackCount": total},
+                })
+                artist["statistics"]["trackCount"] += total
+                artist["statistics"]["trackFileCount"] += files
+            self.artists.append(artist)
+            self.albums.extend(albums)
+            self.albums_by_artist[aid] = albums
+        self.by_id = {a["id"]: a for a in self.artists}
+        self.by_mbid = {a["foreignArtistId"]: a for a in self.artists}
+        self.album_by_id = {a["id"]: a for a in self.albums}
+
+    def tracks(self, album: Dict[str, Any]) -> List[Dict[str, Any]]:
+        st = album["statistics"]
+        return [{
+            "id": album["id"] * 1000 + n,
+            "albumId": album["id"],
+            "artistId": album["artistId"],
+            "trackNumber": str(n),
+            "title": f"Track {n}",
+            "hasFile": n <= st["trackFileCount"],
+        } for n in range(1, st["trackCount"] + 1)]
+
+
+def create_app(library: Library, latency: Dict[str, float], jitter: float = 0.2,
+               with_statistics: bool = True, download_seconds: float = 20.0) -> FastAPI:
+    app = FastAPI(title="fake-lidarr")
+    calls: Counter = Counter()
+    commands: List[Dict[str, Any]] = []
+    # album id -> monotonic time its simulated download started
+    downloads: Dict[int, float] = {}
+
+    async def delay(cls: str):
+        base = latency.get(cls, latency.get("default", 0.0))
+        if base > 0:
+            await asyncio.sleep(base * random.uniform(1 - jitter, 1 + jitter))
+
+    @app.middleware("http")
+    async def count_and_delay(request: Request, call_next):
+        if not request.url.path.startswith("/_stats"):
+            cls = classify(request.url.path)
+            calls[cls] += 1
+            await delay(cls)
+        return await call_next(request)
+
+    def album_out(request: Request, album: Dict[str, Any]) -> Dict[str, Any]:
+        out = {**album, "images": [{"coverType": "cover", "remoteUrl": f"{request.base_url}covers/album/{album['id']}.png"}]}
+        if not with_statistics:
+            out.pop("statistics", None)
+        return out
+
+    @app.get("/_stats")
+    async def stats():
+        return {"calls": dict(calls), "total": sum(calls.values())}
+
+    @app.post("/_stats/reset")
+    async def reset_stats():
+        calls.clear()
+        return {"ok": True}
+
+    @app.get("/api/v1/artist")
+    async def artists():
+        return library.artists
+
+    @app.get("/api/v1/artist/lookup")
+    async def lookup(term: str = ""):
+        if term.startswith("mbid:"):
+            a = library.by_mbid.get(term[5:])
+            return [a] if a else []
+        t = term.lower()
+        return [a for a in library.artists if t in a["artistName"].lower()][:20]
+
+    @app.get("/api/v1/artist/{artist_id}")
+    async def artist(artist_id: str):
+        a = library.by_id.get(int(artist_id)) if artist_id.isdigit() else None
+        return a if a else JSONResponse({"message": "NotFound"}, status_code=404)
+
+    @app.get("/api/v1/search")
+    async def search(term: str = ""):
+        # Museerr consumes /search results as artist objects.
+        t = term.lower()
+        return [a for a in library.artists if t in a["artistName"].lower()][:20]
+
+    @app.get("/api/v1/album")
+    async def albums(request: Request, artistId: Optional[str] = None):
+        if artistId is None:
+            items = library.albums
+        else:
+            items = library.albums_by_artist.get(int(artistId), []) if artistId.isdigit() else []
+        return [album_out(request, a) for a in items]
+
+    @app.get("/api/v1/album/{album_id}")
+    async def album(request: Request, album_id: int):
+        a = library.album_by_id.get(album_id)
+        return album_out(request, a) if a else JSONResponse({"message": "NotFound"}, status_code=404)
+
+    @app.get("/api/v1/track")
+    async def tracks(albumId: Optional[int] = None, artistId: Optional[int] = None):
+        if albumId is not None:
+            a = library.album_by_id.get(albumId)
+            return library.tracks(a) if a else []
+        out = []
+        for a in library.albums_by_artist.get(artistId or 0, []):
+            out.extend(library.tracks(a))
+        return out
+
+    @app.get("/api/v1/mediacover/artist/{artist_id}/{filename}")
+    async def mediacover(artist_id: int, filename: str):
+        # Roughly one artist in five has no poster, forcing the album-cover fallback.
+        if artist_id % 5 == 0:
+            return Response(status_code=404)
+        return Response(png(((artist_id * 37) % 256, (artist_id * 91) % 256, 160), 256), media_type="image/png")
+
+    @app.get("/covers/album/{name}")
+    async def album_cover(name: str):
+        n = int(name.split(".")[0])
+        return Response(png((200, (n * 53) % 256, (n * 17) % 256), 256), media_type="image/png")
+
+    @app.get("/api/v1/qualityprofile")
+    @app.get("/api/v1/metadataprofile")
+    async def profiles():
+        return [{"id": 1, "name": "Any"}, {"id": 2, "name": "Lossless"}]
+
+    def settle_commands():
+        # An AlbumSearch "finds" its albums after a second and hands them to the queue.
+        now = time.monotonic()
+        for cmd in commands:
+            if cmd["status"] == "queued" and now - cmd["_at"] >= 1.0:
+                cmd["status"] = "completed"
+                for album_id in cmd["body"].get("albumIds") or []:
+                    if album_id in library.album_by_id:
+                        downloads.setdefault(album_id, now)
+
+    @app.get("/api/v1/command")
+    async def list_commands():
+        settle_commands()
+        return [{k: v for k, v in c.items() if k != "_at"} for c in commands[-50:]]
+
+    @app.post("/api/v1/command")
+    async def post_command(request: Request):
+        body = await request.json()
+        cmd = {"id": len(commands) + 1, "name": body.get("name"), "status": "queued",
+               "body": body, "queued": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+               "_at": time.monotonic()}
+        commands.append(cmd)
+        return JSONResponse({k: v for k, v in cmd.items() if k != "_at"}, status_code=201)
+
+    @app.get("/api/v1/queue")
+    async def queue(page: int = 1, pageSize: int = 50):
+        # Simulated downloads take download_seconds, then drop out of the queue.
+        settle_commands()
+        now = time.monotonic()
+        records = []
+        for album_id, started in list(downloads.items()):
+            done = (now - started) / download_seconds
+            if done >= 1:
+                del downloads[album_id]
+                continue
+            size = 100_000_000
+            records.append({
+                "id": album_id, "albumId": album_id, "artistId": library.album_by_id[album_id]["artistId"],
+                "title": library.album_by_id[album_id]["title"], "size": size, "sizeleft": int(size * (1 - done)),
+                "status": "downloading", "trackedDownloadState": "downloading", "trackedDownloadStatus": "ok",
+            })
+        start = (page - 1) * pageSize
+        return {"page": page, "pageSize": pageSize, "totalRecords": len(records),
+                "records": records[start:start + pageSize]}
+
+    @app.get("/rest/ping.view")
+    async def ping():
+        return {"subsonic-response": {"status": "ok"}}
+
+    return app
+
+
+def parse_latency(items: List[str]) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for item in items or []:
+        cls, _, secs = item.partition("=")
+        if cls not in ENDPOINT_CLASSES and cls != "default":
+            raise SystemExit(f"unknown endpoint class {cls!r}; expected one of {', '.join(ENDPOINT_CLASSES)}, default")
+        out[cls] = float(secs)
+    return out
+
+
+def add_library_args(p: argparse.ArgumentParser):
+    p.add_argument("--artists", type=int, default=1000)
+    p.add_argument("--albums-per-artist", type=int, default=8)
+    p.add_argument("--tracks-per-album", type=int, default=10)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--latency", action="append", default=[], metavar="CLASS=SECONDS",
+                   help="per-endpoint latency, e.g. lookup=0.8 (repeatable; 'default' applies to the rest)")
+    p.add_argument("--jitter", type=float, default=0.2, help="relative latency jitter (0.2 = +/-20%%)")
+    p.add_argument("--no-statistics", action="store_true",
+                   help="omit album statistics, forcing Museerr's /track fallback")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8686)
+    p.add_argument("--download-seconds", type=float, default=20.0,
+                   help="how long a simulated album download stays in the queue")
+    add_library_args(p)
+    args = p.parse_args()
+
+    import uvicorn
+    lib = Library(args.artists, args.albums_per_artist, args.tracks_per_album, seed=args.seed)
+    app = create_app(lib, parse_latency(args.latency), args.jitter, not args.no_statistics, args.download_seconds)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
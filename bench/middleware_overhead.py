@@ -0,0 +1,140 @@
+"""Per-request overhead of the auth middleware, before and after.
+
+Drives a bare Starlette app in-process (no sockets, no upstream) three
+ways: without auth, behind the previous ``BaseHTTPMiddleware``
+implementation, and behind the current pure ASGI ``AuthMiddleware``. For
+each it reports mean time per request and, for a streamed cover, the time
+until the first body chunk reaches the server:
+
+    python bench/middleware_overhead.py --requests 5000
+"""
+import argparse, asyncio, os, statistics, sys, time
+from typing import Callable, Dict, List
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, RedirectResponse, StreamingResponse
+from starlette.routing import Route
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+from auth import AuthMiddleware, VerifiedSessions  # noqa: E402
+from sessions import SqliteSessionStore  # noqa: E402
+
+CHUNK = b"\0" * 64 * 1024
+CHUNKS = 16
+CHUNK_DELAY = 0.002  # upstream pacing for the streamed cover
+
+
+def legacy_middleware(verify: Callable):
+    """The auth middleware as it was before the pure ASGI rewrite."""
+
+    class LegacyAuthMiddleware(BaseHTTPMiddleware):
+        async def dispatch(self, request, call_next):
+            path = request.url.path
+            if any(path.startswith(x) for x in [
+                "/login", "/token", "/static", "/icons", "/metrics", "/hooks/",
+                "/manifest.webmanifest", "/style.css", "/app.js", "/service-worker.js"
+            ]):
+                return await call_next(request)
+            if not verify(request.cookies.get("session")):
+                return RedirectResponse("/login")
+            return await call_next(request)
+
+    return LegacyAuthMiddleware
+
+
+async def page(request: Request):
+    return PlainTextResponse("ok")
+
+
+async def cover(request: Request):
+    async def body():
+        for _ in range(CHUNKS):
+            await asyncio.sleep(CHUNK_DELAY)
+            yield CHUNK
+    return StreamingResponse(body(), media_type="image/jpeg")
+
+
+def build(kind: str, store) -> Starlette:
+    app = Starlette(routes=[
+        Route("/static/app.css", page), Route("/artist/1", page), Route("/artist/image", cover),
+    ])
+    if kind == "legacy":
+        app.add_middleware(legacy_middleware(store.get))
+    elif kind == "asgi":
+        app.add_middleware(
+            AuthMiddleware, sessions=VerifiedSessions(store.get),
+            public_paths=("/login",), public_prefixes=("/static/",),
+        )
+    return app
+
+
+async def call(app, path: str, cookie: str) -> Dict[str, float]:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench"), (b"cookie", f"session={cookie}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # never disconnects
+
+    t0 = time.perf_counter()
+    first = None
+
+    async def send(message):
+        nonlocal first
+        if message["type"] == "http.response.body" and message.get("body") and first is None:
+            first = time.perf_counter()
+
+    await app(scope, receive, send)
+    end = time.perf_counter()
+    return {"total": end - t0, "first_byte": (first or end) - t0}
+
+
+async def measure(app, path: str, cookie: str, n: int) -> Dict[str, float]:
+    for _ in range(min(n, 200)):
+        await call(app, path, cookie)
+    rows = [await call(app, path, cookie) for _ in range(n)]
+    return {
+        "mean_us": statistics.fmean(r["total"] for r in rows) * 1e6,
+        "first_byte_ms": statistics.fmean(r["first_byte"] for r in rows) * 1e3,
+    }
+
+
+async def main_async(args):
+    db = os.path.join(args.tmp, "bench-sessions.db")
+    store = SqliteSessionStore("bench-secret", 3600, db)
+    cookie = store.create({"u": "bench"})
+    cases = [("static asset", "/static/app.css", args.requests),
+             ("page", "/artist/1", args.requests),
+             ("streamed cover", "/artist/image", max(1, args.requests // 50))]
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for kind in ("none", "legacy", "asgi"):
+        app = build(kind, store)
+        results[kind] = {name: await measure(app, path, cookie, n) for name, path, n in cases}
+
+    print(f"{'case':<16}{'no auth':>12}{'legacy':>12}{'pure ASGI':>12}{'overhead before':>18}{'after':>10}")
+    for name, _, _ in cases:
+        base, old, new = (results[k][name]["mean_us"] for k in ("none", "legacy", "asgi"))
+        print(f"{name:<16}{base:>10.1f}us{old:>10.1f}us{new:>10.1f}us{old - base:>16.1f}us{new - base:>8.1f}us")
+    ttfb: List[str] = [f"{k}={results[k]['streamed cover']['first_byte_ms']:.2f}ms" for k in ("none", "legacy", "asgi")]
+    print("streamed cover, time to first chunk:", ", ".join(ttfb))
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--requests", type=int, default=3000, help="requests per case")
+    p.add_argument("--tmp", default="/tmp", help="directory for the benchmark session database")
+    asyncio.run(main_async(p.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Load-test Museerr against a local fake Lidarr.
+
+Starts ``fake_lidarr.py`` and a Museerr instance pointed at it (unless
+``--museerr-url`` is given), logs in, then drives each route at a fixed
+concurrency and reports latency percentiles, throughput and how many
+upstream calls each route cost:
+
+    python bench/run.py --artists 5000 --requests 300 --concurrency 32 --latency lookup=0.8
+"""
+import argparse, asyncio, json, os, random, socket, statistics, subprocess, sys, tempfile, time
+from typing import Callable, Dict, List
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_lidarr import Library, add_library_args  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def scenarios(lib: Library, rng: random.Random) -> Dict[str, Callable[[], str]]:
+    """Route name -> factory for the next URL to request."""
+    artist = lambda: rng.choice(lib.artists)
+    return {
+        "/": lambda: "/",
+        "/discover/random": lambda: "/discover/random",
+        "/search": lambda: "/search?q=" + artist()["artistName"].split()[0],
+        "/artist/{id}": lambda: f"/artist/{artist()['id']}",
+        "/album/{id}": lambda: f"/album/{rng.choice(lib.albums)['id']}",
+        "/artist/image": lambda: f"/artist/image?id={artist()['id']}",
+        "/artist/image (thumb)": lambda: f"/artist/image?id={artist()['id']}&size=thumb",
+    }
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as c:
+        while time.monotonic() < deadline:
+            try:
+                await c.get(url, timeout=1)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+async def drive(client: httpx.AsyncClient, next_url: Callable[[], str], requests: int, concurrency: int):
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            url = next_url()
+            t0 = time.perf_counter()
+            try:
+                r = await client.get(url)
+                await r.aread()
+                if r.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run(args, lib: Library, museerr: str, fake: str) -> List[dict]:
+    await wait_ready(f"{fake}/_stats")
+    await wait_ready(f"{museerr}/login")
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=museerr, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=fake) as control:
+        await client.post("/token", data={"username": "bench", "password": "bench"})
+        rng = random.Random(args.seed)
+        rows = []
+        for name, next_url in scenarios(lib, rng).items():
+            if args.routes and name not in args.routes:
+                continue
+            if args.warmup:
+                await drive(client, next_url, args.warmup, args.concurrency)
+            await control.post("/_stats/reset")
+            latencies, errors, elapsed = await drive(client, next_url, args.requests, args.concurrency)
+            upstream = (await control.get("/_stats")).json()
+            rows.append({
+                "route": name,
+                "requests": len(latencies),
+                "errors": errors,
+                "rps": len(latencies) / elapsed if elapsed else 0.0,
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+                "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+                "upstream_calls": upstream["total"],
+                "upstream_per_request": upstream["total"] / max(1, len(latencies)),
+                "upstream_by_endpoint": upstream["calls"],
+            })
+        return rows
+
+
+def print_table(rows: List[dict]):
+    header = f"{'route':<24}{'reqs':>6}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'up/req':>8}  upstream"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        by = ", ".join(f"{k}={v}" for k, v in sorted(r["upstream_by_endpoint"].items()))
+        print(f"{r['route']:<24}{r['requests']:>6}{r['errors']:>5}{r['rps']:>9.1f}{r['p50_ms']:>9.1f}"
+              f"{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['upstream_per_request']:>8.2f}  {by}")
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_library_args(p)
+    p.add_argument("--requests", type=int, default=200, help="requests per route")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--warmup", type=int, default=0, help="unmeasured requests per route before measuring")
+    p.add_argument("--route", dest="routes", action="append", help="only run this route (repeatable)")
+    p.add_argument("--workers", type=int, default=1, help="Museerr uvicorn workers")
+    p.add_argument("--museerr-url", help="benchmark an already running Museerr instead of starting one")
+    p.add_argument("--fake-url", help="use an already running fake Lidarr")
+    p.add_argument("--json", dest="json_out", help="also write results to this file")
+    args = p.parse_args()
+
+    lib = Library(args.artists, args.albums_per_artist, args.tracks_per_album, seed=args.seed)
+    procs: List[subprocess.Popen] = []
+    tmp = tempfile.mkdtemp(prefix="museerr-bench-")
+    try:
+        fake = args.fake_url
+        if not fake:
+            port = free_port()
+            cmd = [sys.executable, os.path.join(ROOT, "bench", "fake_lidarr.py"), "--port", str(port),
+                   "--artists", str(args.artists), "--albums-per-artist", str(args.albums_per_artist),
+                   "--tracks-per-album", str(args.tracks_per_album), "--seed", str(args.seed),
+                   "--jitter", str(args.jitter)]
+            for item in args.latency:
+                cmd += ["--latency", item]
+            if args.no_statistics:
+                cmd.append("--no-statistics")
+            procs.append(subprocess.Popen(cmd))
+            fake = f"http://127.0.0.1:{port}"
+        museerr = args.museerr_url
+        if not museerr:
+            port = free_port()
+            env = {**os.environ, "LIDARR_URL": fake, "LIDARR_API_KEY": "bench", "NAVIDROME_URL": fake,
+                   "CONFIG_DIR": tmp, "SESSION_BACKEND": "sqlite"}
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", str(args.workers),
+                 "--log-level", "warning"],
+                cwd=os.path.join(ROOT, "app"), env=env,
+            ))
+            museerr = f"http://127.0.0.1:{port}"
+        rows = asyncio.run(run(args, lib, museerr, fake))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+    print_table(rows)
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"args": vars(args), "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
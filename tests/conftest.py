@@ -0,0 +1,4 @@
+import os, sys
+
+# The app runs from app/ and imports its modules flat (``from cache import ...``).
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
@@ -0,0 +1,73 @@
+import asyncio
+
+from cache import LookupCache, RenderCache, Stale
+
+
+def test_concurrent_misses_share_one_fetch():
+    calls = []
+
+    async def fetch(endpoint, term):
+        calls.append(term)
+        await asyncio.sleep(0.01)
+        return [{"term": term}]
+
+    async def main():
+        c = LookupCache(fetch)
+        a, b = await asyncio.gather(c.get("/artist/lookup", "Bjork"), c.get("/artist/lookup", " bjork "))
+        return c, a, b
+
+    c, a, b = asyncio.run(main())
+    assert calls == ["Bjork"] and a == b
+    assert c.peek("/artist/lookup", "BJORK") == a
+
+
+def test_stale_results_are_flagged_to_every_caller_and_not_cached():
+    flagged = []
+
+    async def fetch(endpoint, term):
+        await asyncio.sleep(0.01)
+        return Stale([1])
+
+    async def main():
+        c = LookupCache(fetch, on_stale=lambda: flagged.append(1))
+        results = await asyncio.gather(*(c.get("/search", "x") for _ in range(3)))
+        return c, results
+
+    c, results = asyncio.run(main())
+    assert results == [[1]] * 3 and len(flagged) == 3
+    assert c.peek("/search", "x") is None
+
+
+def test_errors_are_not_cached():
+    async def fetch(endpoint, term):
+        return None
+
+    c = LookupCache(fetch)
+    assert asyncio.run(c.get("/search", "x")) == []
+    assert c.peek("/search", "x") is None
+
+
+def test_invalidate_during_load_discards_result():
+    async def fetch(endpoint, term):
+        await asyncio.sleep(0.02)
+        return ["old"]
+
+    async def main():
+        c = LookupCache(fetch)
+        task = asyncio.create_task(c.get("/search", "x"))
+        await asyncio.sleep(0.005)
+        c.invalidate()
+        return c, await task
+
+    c, result = asyncio.run(main())
+    assert result == ["old"]
+    assert c.peek("/search", "x") is None
+
+
+def test_render_cache_lru():
+    r = RenderCache(ttl=60, max_entries=2)
+    r.put("a", "A")
+    r.put("b", "B")
+    assert r.get("a") == "A"
+    r.put("c", "C")
+    assert r.get("b") is None and r.get("a") == "A" and r.get("c") == "C"
@@ -0,0 +1,67 @@
+import asyncio, gzip
+
+from compression import CompressionMiddleware, choose_encoding
+
+
+def call(app, accept="gzip"):
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", accept.encode())]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    headers = dict(messages[0].get("headers", []))
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return messages, headers, body
+
+
+def responder(chunks, content_type=b"text/html; charset=utf-8", extra=()):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type), *extra]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("") is None
+
+
+def test_compresses_html_and_weakens_etag():
+    html = b"<p>hello</p>" * 200
+    _, headers, body = call(responder([html], extra=[(b"etag", b'"abc"')]))
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"etag"] == b'W/"abc"'
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert int(headers[b"content-length"]) == len(body)
+    assert gzip.decompress(body) == html
+
+
+def test_small_and_binary_bodies_pass_through():
+    _, headers, body = call(responder([b"tiny"]))
+    assert b"content-encoding" not in headers and body == b"tiny"
+    jpeg = b"\xff\xd8" * 1000
+    _, headers, body = call(responder([jpeg], content_type=b"image/jpeg"))
+    assert b"content-encoding" not in headers and body == jpeg
+
+
+def test_streamed_chunks_are_flushed():
+    chunks = [b"<li>%d</li>" % i * 100 for i in range(3)]
+    messages, headers, body = call(responder(chunks))
+    assert b"content-length" not in headers
+    # Every input chunk produces output straight away, so each is decodable on arrival.
+    assert all(m["body"] for m in messages[1:-1])
+    assert gzip.decompress(body) == b"".join(chunks)
+
+
+def test_no_accept_encoding_is_untouched():
+    html = b"<p>hello</p>" * 200
+    _, headers, body = call(responder([html]), accept="")
+    assert b"content-encoding" not in headers and body == html
@@ -0,0 +1,89 @@
+import asyncio
+
+from dispatch import ALREADY_QUEUED, FAILED, SEARCHING, SearchBatcher
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make(active=(), ok=True, refresh=None, **kw):
+    sent = []
+
+    async def send(ids):
+        sent.append(ids)
+        if isinstance(ok, Exception):
+            raise ok
+        return ok
+
+    b = SearchBatcher(send, lambda k: k in active, refresh, **{"window": 0.01, **kw})
+    return b, sent
+
+
+def test_concurrent_requests_share_one_command():
+    b, sent = make()
+
+    async def main():
+        return await asyncio.gather(b.request([1, 2]), b.request([2, 3]))
+
+    first, second = run(main())
+    assert first == {"1": SEARCHING, "2": SEARCHING}
+    assert second == {"2": SEARCHING, "3": SEARCHING}
+    assert sent == [[1, 2, 3]]
+    assert b.commands_sent == 1 and b.albums_sent == 3
+
+
+def test_active_albums_are_skipped():
+    b, sent = make(active={"2"})
+    assert run(b.request([1, 2])) == {"1": SEARCHING, "2": ALREADY_QUEUED}
+    assert sent == [[1]]
+    assert b.albums_skipped == 1
+
+
+def test_nothing_sent_when_all_active():
+    b, sent = make(active={"1"})
+    assert run(b.request([1])) == {"1": ALREADY_QUEUED}
+    assert sent == []
+
+
+def test_refresh_runs_before_dedupe():
+    active = set()
+
+    async def refresh():
+        active.add("1")
+
+    b, sent = make(active=active, refresh=refresh)
+    assert run(b.request([1, 2])) == {"1": ALREADY_QUEUED, "2": SEARCHING}
+
+
+def test_failed_refresh_still_sends():
+    async def refresh():
+        raise RuntimeError("queue down")
+
+    b, sent = make(active={"1"}, refresh=refresh)
+    assert run(b.request([1, 2])) == {"1": SEARCHING, "2": SEARCHING}
+    assert sent == [[1, 2]]
+
+
+def test_rejected_command_reports_failed():
+    b, _ = make(ok=False)
+    assert run(b.request([1])) == {"1": FAILED}
+    assert b.commands_sent == 0
+
+
+def test_send_error_reports_failed():
+    b, _ = make(ok=RuntimeError("boom"))
+    assert run(b.request([1, 2])) == {"1": FAILED, "2": FAILED}
+
+
+def test_large_batches_are_split():
+    b, sent = make(max_batch=2)
+    assert set(run(b.request(range(5))).values()) == {SEARCHING}
+    assert sent == [[0, 1], [2, 3], [4]]
+    assert b.commands_sent == 3
+
+
+def test_empty_request():
+    b, sent = make()
+    assert run(b.request([])) == {}
+    assert sent == []
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from imagecache import ImageCache
+
+
+def files(d):
+    return [os.path.join(r, f) for r, _, fs in os.walk(d) for f in fs]
+
+
+def disk_bytes(root):
+    return sum(os.path.getsize(p) for p in files(os.path.join(root, "blobs")))
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "images")
+
+
+def make(root, max_bytes=10_000):
+    c = ImageCache(root, max_bytes)
+    c.load()
+    assert c.enabled
+    return c
+
+
+def test_put_get_round_trip(root):
+    c = make(root)
+    img = c.put("artist:1", b"jpegdata", "image/jpeg")
+    assert c.get("artist:1") == img
+    with open(img.path, "rb") as f:
+        assert f.read() == b"jpegdata"
+    # Content-addressed: the same bytes under another key share the blob.
+    assert c.put("artist:2", b"jpegdata", "image/jpeg").path == img.path
+    assert c.total == len(b"jpegdata")
+
+
+def test_evicts_lru_and_forgets_its_keys(root):
+    c = make(root, max_bytes=2500)
+    for i in range(3):
+        c.put(f"k{i}", bytes([i]) * 1000, "image/jpeg")
+    assert c.get("k0") is None
+    assert c.get("k1") is not None and c.get("k2") is not None
+    assert c.total == disk_bytes(root) == 2000
+    assert "k0" not in c._keys
+    assert len(files(os.path.join(root, "keys"))) == 2
+
+
+def test_concurrent_puts_of_one_key(root):
+    c = make(root)
+    data = os.urandom(1000)
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: c.put("k", data, "image/jpeg"), range(32)))
+    assert all(r is not None for r in results)
+    assert c.total == 1000
+    assert not [p for p in files(root) if p.endswith(".tmp")]
+
+
+def test_blob_evicted_by_another_worker_is_a_miss(root):
+    a, b = make(root), make(root)
+    img = a.put("k", b"x" * 100, "image/jpeg")
+    assert b.get("k") == img
+    os.unlink(img.path)  # as another worker's eviction would
+    assert b.get("k") is None
+    assert not os.path.exists(b._key_path("k"))
+
+
+def test_shared_directory_stays_under_the_cap(root):
+    a, b = make(root, max_bytes=20_000), make(root, max_bytes=20_000)
+    for i in range(40):
+        (a if i % 2 else b).put(f"k{i}", os.urandom(2000), "image/jpeg")
+    assert disk_bytes(root) <= 20_000
+    for c in (a, b):
+        for i in range(40):
+            img = c.get(f"k{i}")
+            assert img is None or os.path.exists(img.path)
+
+
+def test_reload_rebuilds_from_disk(root):
+    make(root).put("k", b"abc", "image/png")
+    again = make(root)
+    assert again.total == 3
+    assert again.get("k").media_type == "image/png"
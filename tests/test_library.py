@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from cache import Stale
+from library import ARTIST_SORTS, AlbumStatusCache, is_sort_key, keyset_page, sorted_view
+
+ARTISTS = [{"id": i, "artistName": name} for i, name in
+           enumerate(["delta", "Alpha", "charlie", "bravo", "alpha", "echo", "Foxtrot"], start=1)]
+
+
+def walk(view, limit, desc=False):
+    out, after = [], None
+    while True:
+        page, after = keyset_page(view, after, limit, desc)
+        out.extend(a["id"] for a in page)
+        if after is None:
+            return out
+
+
+def test_forward_pages_cover_everything_in_order():
+    view = sorted_view(ARTISTS, ARTIST_SORTS["name"])
+    expected = [a["id"] for a in view[1]]
+    assert expected == [2, 5, 4, 3, 1, 6, 7]
+    for limit in (1, 2, 3, 7, 50):
+        assert walk(view, limit) == expected
+
+
+def test_backward_pages_mirror_forward():
+    view = sorted_view(ARTISTS, ARTIST_SORTS["name"])
+    forward = [a["id"] for a in view[1]]
+    for limit in (1, 3, 50):
+        assert walk(view, limit, desc=True) == forward[::-1]
+
+
+def test_cursor_survives_inserts():
+    view = sorted_view(ARTISTS, ARTIST_SORTS["name"])
+    page, after = keyset_page(view, None, 3)
+    grown = sorted_view(ARTISTS + [{"id": 99, "artistName": "aardvark"}], ARTIST_SORTS["name"])
+    nxt, _ = keyset_page(grown, after, 2)
+    # The new artist sorts before the cursor, so nothing is repeated or skipped.
+    assert [a["id"] for a in nxt] == [3, 1]
+
+
+def test_last_page_has_no_cursor():
+    view = sorted_view(ARTISTS, ARTIST_SORTS["name"])
+    assert keyset_page(view, None, 7)[1] is None
+    assert keyset_page(view, ("zzz", 0), 3) == ([], None)
+
+
+@pytest.mark.parametrize("key", [("alpha", 2), ["alpha", 2]])
+def test_valid_sort_keys(key):
+    assert is_sort_key(key)
+
+
+@pytest.mark.parametrize("key", [
+    [1, "x"], ["alpha"], ["alpha", 2, 3], ["alpha", "2"], ["alpha", True], ["alpha", 2.5],
+    None, "alpha", {"a": 1},
+])
+def test_bad_cursor_keys_are_rejected(key):
+    assert not is_sort_key(key)
+
+
+def test_album_status_flags_stale_results_to_every_caller():
+    flagged = []
+
+    async def albums(artist_id):
+        await asyncio.sleep(0.01)
+        return Stale([{"id": 1, "statistics": {"trackCount": 2, "trackFileCount": 2}}])
+
+    async def tracks(artist_id):
+        return []
+
+    async def main():
+        c = AlbumStatusCache(albums, tracks, on_stale=lambda: flagged.append(1))
+        return c, await asyncio.gather(c.get(7), c.get(7))
+
+    c, (a, b) = asyncio.run(main())
+    assert a == b and a[0]["downloaded"] is True
+    assert len(flagged) == 2
+    assert c.peek(7) is None
+
+
+def test_album_status_evicts_least_recently_used():
+    calls = []
+
+    async def albums(artist_id):
+        calls.append(artist_id)
+        return [{"id": artist_id, "statistics": {"trackFileCount": 1, "trackCount": 1}}]
+
+    async def main():
+        c = AlbumStatusCache(albums, albums, max_entries=2)
+        await c.get(1)
+        await c.get(2)
+        await c.get(1)
+        await c.get(3)
+        return c
+
+    c = asyncio.run(main())
+    assert c.peek(1) is not None and c.peek(3) is not None
+    assert c.peek(2) is None
+    assert calls == [1, 2, 3] and c.evictions == 1
@@ -0,0 +1,76 @@
+import asyncio
+
+from progress import QueuePoller, album_progress
+
+
+def test_queue_records_fold_per_album():
+    queue = [
+        {"albumId": 1, "size": 100, "sizeleft": 50, "status": "downloading", "album": {"title": "A"}},
+        {"albumId": 1, "size": 100, "sizeleft": 0, "status": "downloading"},
+        {"albumId": 2, "size": 10, "sizeleft": 10, "status": "queued"},
+    ]
+    out = album_progress(queue, [])
+    assert out["1"] == {"album_id": "1", "status": "downloading", "progress": 75.0, "title": "A"}
+    assert out["2"]["status"] == "queued" and out["2"]["progress"] == 0.0
+
+
+def test_failed_and_importing_take_precedence():
+    queue = [
+        {"albumId": 1, "status": "downloading"},
+        {"albumId": 1, "trackedDownloadState": "importFailed"},
+        {"albumId": 2, "status": "completed", "trackedDownloadState": "importPending"},
+    ]
+    out = album_progress(queue, [])
+    assert out["1"]["status"] == "failed"
+    assert out["2"]["status"] == "importing"
+
+
+def test_album_search_commands():
+    commands = [
+        {"name": "AlbumSearch", "status": "started", "body": {"albumIds": [3, 4]}},
+        {"name": "AlbumSearch", "status": "failed", "body": {"albumIds": [5]}},
+        {"name": "AlbumSearch", "status": "completed", "body": {"albumIds": [6]}},
+        {"name": "RefreshArtist", "status": "started", "body": {"albumIds": [7]}},
+    ]
+    queue = [{"albumId": 4, "size": 10, "sizeleft": 5, "status": "downloading"}]
+    out = album_progress(queue, commands)
+    assert out["3"]["status"] == "searching"
+    assert out["4"]["status"] == "downloading"  # the queue knows more than the command
+    assert out["5"]["status"] == "failed"
+    assert "6" not in out and "7" not in out
+
+
+def test_watch_during_a_poll_is_not_finalized_by_it():
+    release = asyncio.Event()
+    commands = []
+
+    async def fetch_queue():
+        await release.wait()
+        return []
+
+    async def fetch_commands():
+        return list(commands)
+
+    async def main():
+        poller = QueuePoller(fetch_queue, fetch_commands)
+        updates = poller.subscribe(9)
+        poll = asyncio.create_task(poller.poll_once())
+        await asyncio.sleep(0)  # the poll has taken its snapshot
+        poller.watch([9])
+        release.set()
+        await poll
+        assert poller.state["9"]["status"] == "searching"
+        # The next poll sees the command and then, once it is gone, finalizes.
+        commands.append({"name": "AlbumSearch", "status": "started", "body": {"albumIds": [9]}})
+        await poller.poll_once()
+        assert poller.state["9"]["status"] == "searching"
+        commands.clear()
+        await poller.poll_once()
+        seen = []
+        while not updates.empty():
+            seen.append(updates.get_nowait()["status"])
+        return poller, seen
+
+    poller, seen = asyncio.run(main())
+    assert poller.state["9"]["status"] == "not_found"
+    assert seen == ["searching", "not_found"]
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from resilience import CLOSED, HALF_OPEN, OPEN, Breaker, CircuitOpen, StaleStore
+
+
+def test_opens_after_threshold():
+    b = Breaker("t", failure_threshold=3, reset_after=60)
+    for _ in range(2):
+        b.failure()
+    assert b.state == CLOSED and b.allow()
+    b.failure()
+    assert b.state == OPEN
+    assert not b.allow()
+
+
+def test_success_resets_failure_count():
+    b = Breaker("t", failure_threshold=2, reset_after=60)
+    b.failure()
+    b.success()
+    b.failure()
+    assert b.state == CLOSED
+
+
+def test_half_open_lets_one_probe_through():
+    b = Breaker("t", failure_threshold=1, reset_after=0)
+    b.failure()
+    assert b.state == OPEN
+    assert b.allow()  # the probe
+    assert b.state == HALF_OPEN
+    assert not b.allow()  # everyone else fails fast while it runs
+
+
+def test_probe_success_closes():
+    b = Breaker("t", failure_threshold=1, reset_after=0)
+    b.failure()
+    assert b.allow()
+    b.success()
+    assert b.state == CLOSED
+    assert b.allow() and b.allow()
+
+
+def test_probe_failure_reopens():
+    b = Breaker("t", failure_threshold=5, reset_after=0)
+    for _ in range(5):
+        b.failure()
+    assert b.allow()
+    b.failure()  # a single failed probe is enough
+    assert b.state == OPEN
+    b.reset_after = 60
+    assert not b.allow()
+
+
+def test_call_raises_while_open():
+    b = Breaker("t", failure_threshold=1, reset_after=60)
+    b.failure()
+
+    async def run():
+        async with b.call():
+            pass
+
+    with pytest.raises(CircuitOpen):
+        asyncio.run(run())
+    assert b.rejected == 1
+
+
+def test_probe_slot_freed_after_call():
+    b = Breaker("t", failure_threshold=1, reset_after=0)
+    b.failure()
+
+    async def run():
+        async with b.call():
+            assert not b.allow()
+
+    asyncio.run(run())
+    # The probe ended without a verdict; the next caller may probe again.
+    assert b.allow()
+
+
+def test_bulkhead_full_raises():
+    b = Breaker("t", max_concurrent=1, queue_timeout=0.01)
+
+    async def run():
+        async with b.call():
+            with pytest.raises(CircuitOpen) as e:
+                async with b.call():
+                    pass
+            assert e.value.reason == "bulkhead full"
+
+    asyncio.run(run())
+    assert b.rejected == 1
+
+
+def test_stale_store_bounds():
+    s = StaleStore(max_entries=2, max_body=10)
+    s.put("a", 1)
+    s.put("b", 2)
+    s.put("c", 3)
+    s.put("big", 4, size=11)
+    assert s.get("a") is None and s.get("big") is None
+    assert s.get("b") == 2 and s.get("c") == 3
+
+
+def test_stale_store_byte_budget_evicts_least_recently_used():
+    s = StaleStore(max_entries=100, max_body=10, max_bytes=20)
+    s.put("a", 1, size=8)
+    s.put("b", 2, size=8)
+    assert s.get("a") == 1  # now more recent than b
+    s.put("c", 3, size=8)
+    assert s.get("b") is None
+    assert s.get("a") == 1 and s.get("c") == 3
+    assert s.total == 16
+
+
+def test_stale_store_replacing_a_key_adjusts_total():
+    s = StaleStore(max_bytes=100)
+    s.put("a", 1, size=30)
+    s.put("a", 2, size=10)
+    assert s.total == 10 and s.get("a") == 2
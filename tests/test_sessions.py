@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+import sessions
+from sessions import (
+    CookieSessionStore, MemorySessionStore, SqliteSessionStore, make_store,
+)
+
+
+@pytest.fixture(params=["memory", "sqlite", "cookie"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore("secret", ttl=60)
+    if request.param == "sqlite":
+        return SqliteSessionStore("secret", ttl=60, path=str(tmp_path / "sessions.db"))
+    return CookieSessionStore("secret", ttl=60)
+
+
+def at(monkeypatch, when):
+    monkeypatch.setattr(sessions.time, "time", lambda: when)
+
+
+def test_round_trip(store):
+    cookie = store.create({"u": "bob"})
+    assert store.get(cookie)["u"] == "bob"
+
+
+def test_rejects_bad_signatures(store):
+    cookie = store.create({"u": "bob"})
+    value, sig = cookie.rsplit(".", 1)
+    assert store.get(f"{value}.{'0' * len(sig)}") is None
+    assert store.get(value) is None
+    assert store.get(None) is None and store.get("") is None
+
+
+def test_rejects_other_keys(store):
+    cookie = store.create({"u": "bob"})
+    store._key = b"another secret"  # as if SECRET_KEY changed
+    assert store.get(cookie) is None
+
+
+def test_forged_cookie_payload_is_rejected():
+    store = CookieSessionStore("secret", ttl=60)
+    forged = CookieSessionStore("change-me", ttl=60).create({"u": "admin"})
+    assert store.get(forged) is None
+
+
+def test_expiry(store, monkeypatch):
+    now = time.time()
+    at(monkeypatch, now)
+    cookie = store.create({"u": "bob"})
+    at(monkeypatch, now + 59)
+    assert store.get(cookie) is not None
+    at(monkeypatch, now + 61)
+    assert store.get(cookie) is None
+
+
+def test_delete(store):
+    cookie = store.create({"u": "bob"})
+    store.delete(cookie)
+    if isinstance(store, CookieSessionStore):
+        assert store.get(cookie) is not None  # stateless: only the browser forgets it
+    else:
+        assert store.get(cookie) is None
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_sweep_drops_only_expired(kind, tmp_path, monkeypatch):
+    store = (MemorySessionStore("secret", ttl=60) if kind == "memory"
+             else SqliteSessionStore("secret", ttl=60, path=str(tmp_path / "sessions.db")))
+    now = time.time()
+    at(monkeypatch, now - 120)
+    old = store.create({"u": "old"})
+    at(monkeypatch, now)
+    new = store.create({"u": "new"})
+    assert store.sweep() == 1
+    assert store._load(old.rsplit(".", 1)[0]) is None
+    assert store.get(new) is not None
+
+
+def test_sqlite_drops_rows_with_passwords(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    legacy = SqliteSessionStore("secret", ttl=60, path=path)
+    with_password = legacy.create({"u": "bob", "p": "hunter2"})
+    without = legacy.create({"u": "al"})
+    reopened = SqliteSessionStore("secret", ttl=60, path=path)
+    assert reopened.get(with_password) is None
+    assert reopened.get(without) is not None
+
+
+@pytest.mark.parametrize("secret", ["", "change-me"])
+def test_cookie_backend_refuses_default_secret(secret, tmp_path):
+    with pytest.raises(ValueError):
+        make_store("cookie", secret, 60, str(tmp_path / "sessions.db"))
+
+
+def test_make_store_backends(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    assert isinstance(make_store("cookie", "a private key", 60, path), CookieSessionStore)
+    assert isinstance(make_store("sqlite", "change-me", 60, path), SqliteSessionStore)
+    assert isinstance(make_store("memory", "change-me", 60, path), MemorySessionStore)
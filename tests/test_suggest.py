@@ -0,0 +1,44 @@
+from suggest import SuggestIndex, normalize
+
+
+def build():
+    idx = SuggestIndex()
+    idx.build(
+        [(1, "Björk"), (2, "Radiohead"), (3, "The Radio Dept.")],
+        [(10, "OK Computer", {"artist": "Radiohead"}), (11, "Homogenic", {"artist": "Björk"})],
+    )
+    return idx
+
+
+def test_normalize():
+    assert normalize("  Björk!! ") == "bjork"
+    assert normalize("AC/DC") == "ac dc"
+
+
+def test_prefix_matches_rank_artists_first():
+    hits = build().query("radio")
+    assert [h["id"] for h in hits[:2]] == [2, 3]
+
+
+def test_multi_word_prefix():
+    hits = build().query("the rad")
+    assert hits[0]["id"] == 3
+
+
+def test_typo_tolerance_and_album_extra():
+    hits = build().query("ok computr")
+    assert hits[0] == {"type": "album", "id": 10, "label": "OK Computer", "artist": "Radiohead"}
+
+
+def test_empty():
+    assert build().query("  ") == []
+    assert SuggestIndex().query("radio") == []
+
+
+def test_rebuild_does_not_disturb_a_held_snapshot():
+    idx = build()
+    before = idx._index
+    idx.build([(4, "Aphex Twin")], [])
+    # A query that read the old snapshot keeps a consistent view of it.
+    assert len(before.entries) == 5 and len(idx) == 1
+    assert idx.query("aph")[0]["id"] == 4